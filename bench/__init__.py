@@ -0,0 +1 @@
+"""本地替身服务器与性能测试（不访问真实站点）"""
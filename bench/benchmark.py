@@ -0,0 +1,228 @@
+"""端到端性能测试：在本地替身服务器上跑完整的检查轮次
+
+    python -m bench.benchmark
+    python -m bench.benchmark --sizes 1 100 1000 --workers 16 --latency 0.02
+    python -m bench.benchmark --json result.json
+    python -m bench.benchmark --baseline result.json --tolerance 0.2
+
+测量内容：
+- 轮次耗时与吞吐：1/100/1000 个监控器（各站点轮流分配）的首轮（冷）与后续轮次（热，命中响应指纹缓存）
+- 各站点解析耗时：JSON 解析、MokaHR 解密与记录提取，单次微秒数
+
+指定 --baseline 时与之前保存的结果比较，任一指标变慢超过 tolerance 比例则以退出码 1 结束。
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+from bench.standin import (
+    StandinServer,
+    huyu_payload,
+    leihuo_payload,
+    mihoyo_payload,
+    mokahr_payload,
+)
+from main import build_monitors, run_round
+from monitors.coalesce import RequestCoalescer, configure_coalescer
+from monitors.ratelimit import configure_rate_limiter
+from monitors.state import configure_state_store
+from monitors.transport import configure_transport
+from runner import ConcurrentRunner
+
+PROVIDERS = ("mihoyo", "netease_leihuo", "netease_huyu", "mokahr")
+
+# 各站点的解析方法名与对应的合成响应
+_PARSERS = {
+    "mihoyo": ("_parse_page", lambda n: mihoyo_payload(n, page_size=n)),
+    "netease_leihuo": ("_parse_status", leihuo_payload),
+    "netease_huyu": ("_parse_status", huyu_payload),
+    "mokahr": ("_parse_status", mokahr_payload),
+}
+
+
+class _NullNotifier:
+    """只计数、不发送的通知器"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def notify(self, company, status):
+        self.sent += 1
+
+    def queue_depth(self):
+        return 0
+
+
+def _company(provider: str, index: int, base_url: str, track_all: bool) -> dict:
+    company = {
+        "name": f"bench-{provider}-{index}",
+        "provider": provider,
+        "base_url": base_url,
+        # 凭据各不相同，避免请求合并把多个监控器折叠成一次上游调用
+        "headers": {"Cookie": f"bench={index}"},
+        "track_all": track_all,
+    }
+    if provider == "mokahr":
+        company["extra"] = {"request_body": {"orgId": "hypergryph", "siteId": 1}}
+    return company
+
+
+def bench_rounds(server: StandinServer, size: int, args, state_store, transport) -> dict:
+    config = {
+        "companies": [
+            _company(PROVIDERS[i % len(PROVIDERS)], i, server.url, args.track_all)
+            for i in range(size)
+        ]
+    }
+    entries = build_monitors(config)
+    monitors = [monitor for monitor, _entry in entries]
+    runner = ConcurrentRunner(max_workers=args.workers, timeout=args.timeout)
+    notifier = _NullNotifier()
+
+    durations: List[float] = []
+    failures = 0
+    requests_before = server.requests
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        results = run_round(runner, monitors, notifier, state_store, transport)
+        durations.append(time.perf_counter() - started)
+        failures += sum(1 for r in results.values() if r not in ("changed", "unchanged"))
+
+    warm = statistics.median(durations[1:]) if len(durations) > 1 else durations[0]
+    return {
+        "monitors": size,
+        "cold_seconds": round(durations[0], 4),
+        "warm_seconds": round(warm, 4),
+        "checks_per_second": round(size / warm, 1) if warm else None,
+        "upstream_requests": server.requests - requests_before,
+        "failures": failures,
+        "notifications": notifier.sent,
+    }
+
+
+def _response(payload: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    response.encoding = "utf-8"
+    response.headers["Content-Type"] = "application/json; charset=utf-8"
+    return response
+
+
+def bench_parse(provider: str, records: int, iterations: int) -> dict:
+    method, build = _PARSERS[provider]
+    (monitor, _entry), = build_monitors(
+        {"companies": [_company(provider, 0, "http://127.0.0.1", track_all=True)]}
+    )
+    # window 为 0：每次都真实解码，测的是解析本身而非缓存
+    monitor.coalescer = RequestCoalescer(window=0)
+    parse = getattr(monitor, method)
+    response = _response(build(records))
+    parse(response)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse(response)
+    elapsed = time.perf_counter() - started
+    return {
+        "provider": provider,
+        "records": records,
+        "bytes": len(response.content),
+        "us_per_parse": round(elapsed / iterations * 1e6, 1),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """返回相对 baseline 变慢超过 tolerance 的指标"""
+    regressions = []
+    old_rounds = {r["monitors"]: r for r in baseline.get("rounds", [])}
+    for r in result["rounds"]:
+        old = old_rounds.get(r["monitors"])
+        for key in ("cold_seconds", "warm_seconds"):
+            if old and old.get(key) and r[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{r['monitors']} 个监控器 {key}: {old[key]} → {r[key]}")
+    old_parse = {p["provider"]: p for p in baseline.get("parse", [])}
+    for p in result["parse"]:
+        old = old_parse.get(p["provider"])
+        if old and p["us_per_parse"] > old["us_per_parse"] * (1 + tolerance):
+            regressions.append(
+                f"{p['provider']} 解析: {old['us_per_parse']}us → {p['us_per_parse']}us"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="在本地替身服务器上测量检查轮次与解析性能")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000], help="监控器数量")
+    parser.add_argument("--rounds", type=int, default=3, help="每种规模跑几轮（首轮为冷启动）")
+    parser.add_argument("--workers", type=int, default=16, help="并发检查数")
+    parser.add_argument("--timeout", type=float, default=120, help="单个检查超时（秒）")
+    parser.add_argument("--records", type=int, default=10, help="每个站点返回的投递条数")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务器固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="替身服务器随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务器返回 500 的比例")
+    parser.add_argument("--retries", type=int, default=0, help="HTTP 重试次数")
+    parser.add_argument("--track-all", action="store_true", help="以 track_all 模式创建监控器")
+    parser.add_argument("--parse-iterations", type=int, default=500)
+    parser.add_argument("--json", help="把结果写入该文件")
+    parser.add_argument("--baseline", help="与之前保存的结果比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许变慢的比例")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    tmp = tempfile.TemporaryDirectory()
+    state_store = configure_state_store({"state": {"path": str(Path(tmp.name) / "state.json")}})
+    transport = configure_transport(
+        {"http": {"pool_maxsize": args.workers, "retries": args.retries, "backoff": 0}}
+    )
+    configure_rate_limiter({})
+    configure_coalescer({})
+
+    result: Dict[str, list] = {"rounds": [], "parse": []}
+    server = StandinServer(
+        records=args.records,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+    with server:
+        for size in args.sizes:
+            r = bench_rounds(server, size, args, state_store, transport)
+            result["rounds"].append(r)
+            print(
+                f"{r['monitors']:>5} 个监控器  冷 {r['cold_seconds']:.3f}s  热 {r['warm_seconds']:.3f}s  "
+                f"{r['checks_per_second']} 次/秒  上游请求 {r['upstream_requests']}  失败 {r['failures']}"
+            )
+
+    for provider in PROVIDERS:
+        p = bench_parse(provider, args.records, args.parse_iterations)
+        result["parse"].append(p)
+        print(f"{provider:>15} 解析 {p['records']} 条（{p['bytes']} 字节）  {p['us_per_parse']}us/次")
+    tmp.cleanup()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"性能回退: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,344 @@
+"""本地替身服务器：模拟各站点的投递记录接口
+
+用于离线调试与性能测试，不访问真实站点。启动后把公司条目的 base_url 指向它即可：
+
+    python -m bench.standin --port 8900 --records 10 --latency 0.05 --error-rate 0.01
+
+    {"name": "米哈游", "provider": "mihoyo", "base_url": "http://127.0.0.1:8900", ...}
+
+所有站点共用同一个端口（按接口路径区分）。payload_dir 中存在 <provider>.json 时
+原样返回该文件（录制的真实响应），否则按 records 条数生成合成数据。
+
+POST 到 /hooks/<任意名称> 的请求视为通知渠道的投递（webhook、机器人），
+请求体记录在 StandinServer.hooks 中，用于在本地测试通知渠道：
+
+    {"type": "webhook", "url": "http://127.0.0.1:8900/hooks/ops"}
+"""
+
+import argparse
+import base64
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# MokaHR 响应使用的固定 IV（与 monitors/mokahr.py 一致）
+MOKAHR_IV = "de7c21ed8d6f50fe"
+MOKAHR_KEY = "0123456789abcdef"
+
+_MIHOYO_STAGES = ("简历筛选", "笔试", "一面", "二面", "HR面", "已发放offer")
+_LEIHUO_STAGES = ("简历评估中", "笔试中", "面试中", "录用审批中", "已录用")
+_HUYU_NODES = ("S001", "E001", "I0010001", "I0020001", "T001", "O001")
+_MOKA_STAGES = ("初筛", "笔试", "面试", "Offer")
+
+
+def _stage(stages, index: int, version: int) -> str:
+    return stages[(index + version) % len(stages)]
+
+
+def mihoyo_payload(records: int, page_no: int = 1, page_size: int = 10, version: int = 0) -> dict:
+    start = (page_no - 1) * page_size
+    items = [
+        {"id": f"job-{i}", "jobTitle": f"游戏客户端开发-{i}", "status": _stage(_MIHOYO_STAGES, i, version)}
+        for i in range(start, min(start + page_size, records))
+    ]
+    return {"code": 0, "message": "ok", "data": {"list": items, "total": records}}
+
+
+def leihuo_payload(records: int, version: int = 0) -> dict:
+    items = [
+        {
+            "id": i,
+            "invalidFlag": 0,
+            "applyPosition": f"游戏研发工程师-{i}",
+            "projectName": "2026校园招聘",
+            "applyStatusValue": _stage(_LEIHUO_STAGES, i, version),
+        }
+        for i in range(records)
+    ]
+    return {"code": 200, "msg": "ok", "data": {"leihuoList": items}}
+
+
+def huyu_payload(records: int, version: int = 0) -> dict:
+    items = [
+        {
+            "id": i,
+            "positionName": f"游戏策划-{i}",
+            "projectName": "2026校园招聘",
+            "curProcessNode": _stage(_HUYU_NODES, i, version),
+            "curProcessNodeStatus": 1,
+        }
+        for i in range(records)
+    ]
+    return {"status": 1, "message": "ok", "data": items}
+
+
+def mokahr_plain_payload(records: int, org_id: str = "hypergryph", version: int = 0) -> dict:
+    apps = [
+        {
+            "appId": i,
+            "orgName": org_id,
+            "jobTitle": f"后端开发-{i}",
+            "stage": _stage(_MOKA_STAGES, i, version),
+        }
+        for i in range(records)
+    ]
+    return {
+        "code": 0,
+        "data": {
+            "campusApplyList": [
+                {"id": org_id, "candidateApps": [{"projectApps": [{"apps": apps}]}]}
+            ]
+        },
+    }
+
+
+def mokahr_envelope(plain: dict, key: str = MOKAHR_KEY) -> dict:
+    """按 MokaHR 的格式加密：AES-CBC，密钥为 necromancer 字段，固定 IV
+
+    客户端解密后不去除填充，这里用空格补齐到块大小（JSON 解析时会被忽略）。
+    """
+    from Crypto.Cipher import AES
+
+    raw = json.dumps(plain, ensure_ascii=False).encode("utf-8")
+    raw += b" " * (-len(raw) % AES.block_size)
+    cipher = AES.new(key.encode("utf-8"), AES.MODE_CBC, MOKAHR_IV.encode("utf-8"))
+    return {
+        "data": base64.b64encode(cipher.encrypt(raw)).decode("ascii"),
+        "necromancer": key,
+    }
+
+
+def mokahr_payload(records: int, org_id: str = "hypergryph", version: int = 0) -> dict:
+    return mokahr_envelope(mokahr_plain_payload(records, org_id, version))
+
+
+# 接口路径 -> (provider, HTTP 方法)
+ROUTES: Dict[str, Tuple[str, str]] = {
+    "/ats-portal/v1/apply_job/list": ("mihoyo", "POST"),
+    "/api/campuspc/apply/find": ("netease_leihuo", "GET"),
+    "/api/recruitment/campus/deliveryRecord/currentDeliveryRecord": ("netease_huyu", "GET"),
+    "/api/outer/ats-apply/personal-center/applications": ("mokahr", "POST"),
+}
+
+# 通知渠道投递的路径前缀
+HOOK_PREFIX = "/hooks/"
+
+
+class StandinServer:
+    """在后台线程运行的替身服务器
+
+    - latency/jitter：每个请求固定延迟 + [0, jitter) 的随机延迟（秒）
+    - error_rate：按比例返回 HTTP 500
+    - auth_error_rate：按比例返回 HTTP 401
+    - change_every：每处理多少个请求推进一次所有投递的阶段（0 表示状态永不变化）
+    - hooks：收到的通知投递 [{"path", "body", "received"}]（延迟与错误注入同样生效）
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        records: int = 5,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        auth_error_rate: float = 0.0,
+        change_every: int = 0,
+        payload_dir: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        self.records = int(records)
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.error_rate = float(error_rate)
+        self.auth_error_rate = float(auth_error_rate)
+        self.change_every = int(change_every)
+        self.payload_dir = Path(payload_dir) if payload_dir else None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.hooks: List[dict] = []
+        self._cache: Dict[tuple, bytes] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="standin", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+    # --- 内部方法 ---
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # keep-alive 下响应头与响应体分两次写出，关闭 Nagle 避免 40ms 的延迟确认
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def do_POST(self):
+                server._handle(self, "POST")
+
+            def log_message(self, fmt, *args):
+                logging.debug("standin: " + fmt % args)
+
+        return Handler
+
+    def _next(self) -> Tuple[int, float, int]:
+        """返回 (版本号, 延迟秒数, 注入的状态码)"""
+        with self._lock:
+            self.requests += 1
+            version = self.requests // self.change_every if self.change_every else 0
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._random.random()
+            status = 0
+            if roll < self.error_rate:
+                status = 500
+            elif roll < self.error_rate + self.auth_error_rate:
+                status = 401
+            if status:
+                self.errors += 1
+            return version, delay, status
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        length = int(handler.headers.get("Content-Length") or 0)
+        raw = handler.rfile.read(length) if length else b""
+        path = urlsplit(handler.path).path
+        route = ROUTES.get(path)
+        version, delay, status = self._next()
+        if delay:
+            time.sleep(delay)
+
+        if path.startswith(HOOK_PREFIX) and method == "POST":
+            if status:
+                self._reply(handler, status, b'{"message": "injected error"}')
+                return
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = raw.decode("utf-8", "replace")
+            with self._lock:
+                self.hooks.append({"path": path, "body": body, "received": time.time()})
+            # 同时满足常见机器人接口的成功条件（errcode / code 为 0）
+            self._reply(handler, 200, b'{"ok": true, "errcode": 0, "code": 0}')
+            return
+        if route is None or route[1] != method:
+            self._reply(handler, 404, b'{"message": "not found"}')
+            return
+        if status:
+            self._reply(handler, status, b'{"message": "injected error"}')
+            return
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+        self._reply(handler, 200, self._payload(route[0], body, version))
+
+    def _payload(self, provider: str, body: dict, version: int) -> bytes:
+        if self.payload_dir is not None:
+            recorded = self.payload_dir / f"{provider}.json"
+            if recorded.exists():
+                return recorded.read_bytes()
+
+        if provider == "mihoyo":
+            key = (provider, body.get("pageNo", 1), body.get("pageSize", 10), version)
+        elif provider == "mokahr":
+            key = (provider, body.get("orgId", "hypergryph"), version)
+        else:
+            key = (provider, version)
+        # 同一版本的响应体不变，缓存后避免替身本身（尤其是 AES 加密）成为瓶颈
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        builders: Dict[str, Callable[[], dict]] = {
+            "mihoyo": lambda: mihoyo_payload(self.records, key[1], key[2], version),
+            "netease_leihuo": lambda: leihuo_payload(self.records, version),
+            "netease_huyu": lambda: huyu_payload(self.records, version),
+            "mokahr": lambda: mokahr_payload(self.records, key[1], version),
+        }
+        data = json.dumps(builders[provider](), ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._cache[key] = data
+        return data
+
+    @staticmethod
+    def _reply(handler: BaseHTTPRequestHandler, status: int, data: bytes) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="各站点投递接口的本地替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--records", type=int, default=5, help="每个站点返回的投递条数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的比例")
+    parser.add_argument("--auth-error-rate", type=float, default=0.0, help="返回 401 的比例")
+    parser.add_argument("--change-every", type=int, default=0, help="每多少个请求推进一次投递阶段")
+    parser.add_argument("--payload-dir", help="录制响应所在目录（<provider>.json）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    server = StandinServer(
+        host=args.host,
+        port=args.port,
+        records=args.records,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        auth_error_rate=args.auth_error_rate,
+        change_every=args.change_every,
+        payload_dir=args.payload_dir,
+    )
+    logging.info(f"替身服务器已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
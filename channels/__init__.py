@@ -0,0 +1,6 @@
+"""Notification channels package.
+
+Modules under this package can register channels via the registry decorator.
+"""
+
+__all__ = []
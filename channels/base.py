@@ -0,0 +1,44 @@
+from typing import List
+
+
+def changes_of(item: dict) -> List[dict]:
+    """通知条目中的状态变化列表 [{"company", "status"}, ...]
+
+    单条通知只有一项；digest 合并的通知带有 changes 字段，包含本轮所有变化。
+    """
+    if item.get("changes"):
+        return list(item["changes"])
+    return [{"company": item.get("company"), "status": item.get("status")}]
+
+
+class Channel:
+    """通知渠道基类
+
+    子类通过 @register_channel 注册，并实现 send()：投递一条通知，失败时抛出异常
+    （由分发器负责重试与退避）。send() 只在该渠道自己的分发线程中调用，
+    因此子类可以放心地复用连接，不需要加锁。
+
+    config.json 中的渠道条目：{"type": "webhook", "name": "ops", "timeout": 10, ...}，
+    name 默认等于 type，用于区分指标与通知队列文件，同一配置中不能重复。
+    """
+
+    channel_type = ""
+
+    def __init__(self, name: str = "", timeout: float = 10.0):
+        self.name = name or self.channel_type
+        self.timeout = float(timeout)
+
+    @classmethod
+    def from_config(cls, entry: dict, cfg: dict) -> "Channel":
+        """entry 为 channels 中的一项，cfg 为完整配置（部分渠道需要读取顶层字段）"""
+        return cls(entry.get("name", ""), timeout=entry.get("timeout", 10))
+
+    def send(self, item: dict) -> None:
+        """投递一条通知（Outbox 条目，含 subject/body/created 等字段）"""
+        raise NotImplementedError
+
+    def disconnect(self) -> None:
+        """释放复用的连接：空闲超时或投递失败时由分发器调用，下次投递时重新建立"""
+
+    def close(self) -> None:
+        self.disconnect()
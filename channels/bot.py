@@ -0,0 +1,72 @@
+import copy
+from typing import Any
+
+from channels.base import changes_of
+from channels.registry import register_channel
+from channels.webhook import WebhookChannel
+from monitors.spec import compile_predicate
+
+# 常见机器人的消息体模板与成功条件
+PRESETS = {
+    "dingtalk": ({"msgtype": "text", "text": {"content": "{text}"}}, {"errcode": 0}),
+    "wecom": ({"msgtype": "text", "text": {"content": "{text}"}}, {"errcode": 0}),
+    "feishu": ({"msg_type": "text", "content": {"text": "{text}"}}, {"code": 0}),
+    "slack": ({"text": "{text}"}, None),
+}
+
+
+def _render(template: Any, values: dict) -> Any:
+    """把模板中所有字符串里的 {占位符} 替换为对应的值，其余内容原样保留"""
+    if isinstance(template, str):
+        for key, value in values.items():
+            template = template.replace("{" + key + "}", value)
+        return template
+    if isinstance(template, dict):
+        return {k: _render(v, values) for k, v in template.items()}
+    if isinstance(template, list):
+        return [_render(v, values) for v in template]
+    return template
+
+
+@register_channel("bot")
+class BotChannel(WebhookChannel):
+    """通用 HTTP 机器人渠道：按模板生成消息体后 POST 到机器人地址
+
+    {"type": "bot", "preset": "dingtalk", "url": "https://oapi.dingtalk.com/robot/send?access_token=..."}
+    {"type": "bot", "url": "...", "body": {"msg": "{subject}: {text}"}, "success": {"code": 0}}
+
+    preset 可选 dingtalk / wecom / feishu / slack，提供默认的 body 与 success；
+    body 中的字符串可使用占位符 {subject}、{body}、{text}（标题加正文）、{company}、{status}
+    （digest 合并的通知中 company 为所有公司名，status 为空）。
+    """
+
+    def __init__(self, url: str, body: Any = None, **kwargs):
+        super().__init__(url, **kwargs)
+        self.body = body if body is not None else {"text": "{text}"}
+
+    @classmethod
+    def from_config(cls, entry: dict, cfg: dict) -> "BotChannel":
+        preset = entry.get("preset")
+        if preset is not None and preset not in PRESETS:
+            raise ValueError(f"未知的机器人类型: {preset}（可选 {', '.join(PRESETS)}）")
+        body, success = PRESETS.get(preset, (None, None))
+        return cls(
+            entry.get("url", ""),
+            body=copy.deepcopy(entry.get("body", body)),
+            name=entry.get("name") or preset or "",
+            method=entry.get("method", "POST"),
+            headers=entry.get("headers"),
+            timeout=entry.get("timeout", 10),
+            success=compile_predicate(entry.get("success", success)),
+        )
+
+    def payload(self, item: dict) -> Any:
+        changes = changes_of(item)
+        values = {
+            "subject": item["subject"],
+            "body": item["body"],
+            "text": f"{item['subject']}\n{item['body']}",
+            "company": "、".join(str(c.get("company") or "") for c in changes),
+            "status": str(changes[0].get("status") or "") if len(changes) == 1 else "",
+        }
+        return _render(self.body, values)
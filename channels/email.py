@@ -0,0 +1,79 @@
+import smtplib
+from email.mime.text import MIMEText
+from typing import Optional
+
+from channels.base import Channel
+from channels.registry import register_channel
+from monitors.metrics import get_metrics
+
+
+@register_channel("email")
+class EmailChannel(Channel):
+    """邮件渠道：复用同一个已登录的 SMTP 连接，空闲或出错时断开
+
+    渠道条目中的 email 字段覆盖顶层 email（例如只改 receiver）：
+    {"type": "email", "email": {"receiver": "other@example.com"}, "timeout": 30}
+    """
+
+    def __init__(self, email_config: dict, name: str = "", port: int = 465, timeout: float = 30.0):
+        super().__init__(name, timeout=timeout)
+        if not email_config.get("smtp_server"):
+            raise ValueError("邮件渠道缺少 email 配置（smtp_server 等）")
+        self.email_config = email_config
+        self.port = int(port)
+        self._server: Optional[smtplib.SMTP_SSL] = None
+
+    @classmethod
+    def from_config(cls, entry: dict, cfg: dict) -> "EmailChannel":
+        email_config = {**cfg.get("email", {}), **entry.get("email", {})}
+        return cls(
+            email_config,
+            name=entry.get("name", ""),
+            port=email_config.get("port", 465),
+            timeout=entry.get("timeout", 30),
+        )
+
+    def send(self, item: dict) -> None:
+        with get_metrics().phase("email"):
+            self._send(self._build(item["subject"], item["body"]))
+
+    def disconnect(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+    # --- 内部方法 ---
+    def _build(self, subject: str, body: str) -> MIMEText:
+        msg = MIMEText(body, "plain", "utf-8")
+        msg["Subject"] = subject
+        msg["From"] = self.email_config["sender"]
+        msg["To"] = self.email_config["receiver"]
+        return msg
+
+    def _connect(self) -> smtplib.SMTP_SSL:
+        server = smtplib.SMTP_SSL(
+            self.email_config["smtp_server"], self.port, timeout=self.timeout
+        )
+        server.login(self.email_config["sender"], self.email_config["password"])
+        return server
+
+    def _send(self, msg: MIMEText) -> None:
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.sendmail(
+                    self.email_config["sender"],
+                    [self.email_config["receiver"]],
+                    msg.as_string(),
+                )
+                return
+            except smtplib.SMTPServerDisconnected:
+                # 复用的连接可能已被服务器断开，重连后再试一次
+                self._server = None
+                if attempt:
+                    raise
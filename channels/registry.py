@@ -0,0 +1,65 @@
+import importlib
+import logging
+import pkgutil
+from typing import Callable, Dict, Type
+
+CHANNEL_REGISTRY: Dict[str, Type] = {}
+
+# channels 包中的基础设施模块，不是通知渠道
+SUPPORT_MODULES = {
+    "__init__",
+    "registry",
+    "base",
+}
+
+
+def register_channel(name: str) -> Callable[[Type], Type]:
+    """类装饰器：注册通知渠道到注册表。
+
+    用法：
+    @register_channel("webhook")
+    class WebhookChannel(Channel):
+        ...
+    """
+
+    def decorator(cls: Type) -> Type:
+        key = name.strip().lower()
+        cls.channel_type = key
+        CHANNEL_REGISTRY[key] = cls
+        return cls
+
+    return decorator
+
+
+def _import_channel(modname: str) -> None:
+    try:
+        importlib.import_module(f"channels.{modname}")
+    except ImportError as e:
+        if getattr(e, "name", None) == f"channels.{modname}":
+            return
+        logging.error(f"加载通知渠道模块 channels.{modname} 失败: {str(e)}")
+
+
+def get_channel_class(name: str):
+    """按类型名获取通知渠道类，首次使用时才导入对应模块
+
+    约定类型名与 channels 下的模块名相同（如 webhook → channels/webhook.py）；
+    若模块名与注册名不一致，则退回到扫描整个 channels 包。
+    """
+    key = (name or "").strip().lower()
+    if not key:
+        return None
+    if key in CHANNEL_REGISTRY:
+        return CHANNEL_REGISTRY[key]
+
+    if key.isidentifier() and key not in SUPPORT_MODULES:
+        _import_channel(key)
+        if key in CHANNEL_REGISTRY:
+            return CHANNEL_REGISTRY[key]
+
+    import channels as channels_pkg
+
+    for _finder, modname, _ispkg in pkgutil.iter_modules(channels_pkg.__path__):
+        if modname not in SUPPORT_MODULES:
+            _import_channel(modname)
+    return CHANNEL_REGISTRY.get(key)
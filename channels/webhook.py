@@ -0,0 +1,83 @@
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from channels.base import Channel, changes_of
+from channels.registry import register_channel
+from monitors.spec import compile_predicate
+
+
+@register_channel("webhook")
+class WebhookChannel(Channel):
+    """Webhook 渠道：把通知以 JSON POST 到指定地址
+
+    {
+      "type": "webhook",
+      "url": "https://example.com/hooks/offer",
+      "headers": {"Authorization": "Bearer ..."},
+      "timeout": 10,
+      "success": {"ok": true}
+    }
+    请求体：{"subject", "text", "created", "changes": [{"company", "status"}, ...]}。
+    HTTP 状态码非 2xx 视为失败；配置了 success 时响应体还需满足该条件
+    （写法同站点规则中的 success，见 monitors/spec.py）。
+    使用渠道独立的 HTTP 会话，不占用轮询的连接池；timeout 同时作为连接与读取超时。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        name: str = "",
+        method: str = "POST",
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10.0,
+        success: Optional[Callable[[Any], bool]] = None,
+    ):
+        super().__init__(name, timeout=timeout)
+        if not url:
+            raise ValueError(f"通知渠道 {self.name} 缺少 url")
+        self.url = url
+        self.method = method.upper()
+        self.headers = dict(headers or {})
+        self.success = success
+        self._session = requests.Session()
+
+    @classmethod
+    def from_config(cls, entry: dict, cfg: dict) -> "WebhookChannel":
+        return cls(
+            entry.get("url", ""),
+            name=entry.get("name", ""),
+            method=entry.get("method", "POST"),
+            headers=entry.get("headers"),
+            timeout=entry.get("timeout", 10),
+            success=compile_predicate(entry.get("success")),
+        )
+
+    def payload(self, item: dict) -> Any:
+        return {
+            "subject": item["subject"],
+            "text": item["body"],
+            "created": item["created"],
+            "changes": changes_of(item),
+        }
+
+    def send(self, item: dict) -> None:
+        response = self._session.request(
+            self.method,
+            self.url,
+            json=self.payload(item),
+            headers=self.headers,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        if self.success is None:
+            return
+        try:
+            data = response.json()
+        except ValueError:
+            raise ValueError(f"响应不是 JSON: {response.text[:200]}") from None
+        if not self.success(data):
+            raise RuntimeError(f"接口返回失败: {response.text[:200]}")
+
+    def disconnect(self) -> None:
+        self._session.close()
@@ -0,0 +1,94 @@
+"""查询 SQLite 状态历史的小工具
+
+用法：
+    python history.py companies
+    python history.py timeline 网易雷火 [--position ID] [--limit 50]
+    python history.py durations 网易雷火 [--position ID]
+
+数据库路径默认取 config.json 中 state.path，其次为环境变量 STATE_DB_PATH。
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+
+from monitors.state import STATE_DB, HistoryReader
+
+CONFIG_FILE = os.environ.get("CONFIG_PATH", "config.json")
+
+
+def _default_db_path() -> str:
+    try:
+        with open(CONFIG_FILE, encoding="utf-8") as f:
+            state_cfg = json.load(f).get("state", {})
+        if str(state_cfg.get("backend", "")).lower() == "sqlite":
+            return state_cfg.get("path", STATE_DB)
+    except (OSError, ValueError):
+        pass
+    return STATE_DB
+
+
+def _fmt_time(ts: float) -> str:
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+
+
+def _fmt_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes = rest // 60
+    if days:
+        return f"{days}天{hours}小时"
+    if hours:
+        return f"{hours}小时{minutes}分"
+    return f"{minutes}分"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="查询投递状态历史")
+    parser.add_argument("--db", default=None, help="SQLite 数据库路径")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("companies", help="列出有历史记录的公司")
+
+    p_timeline = sub.add_parser("timeline", help="状态变化时间线")
+    p_timeline.add_argument("company")
+    p_timeline.add_argument("--position", default=None)
+    p_timeline.add_argument("--limit", type=int, default=50)
+
+    p_durations = sub.add_parser("durations", help="各阶段停留时长")
+    p_durations.add_argument("company")
+    p_durations.add_argument("--position", default=None)
+
+    args = parser.parse_args(argv)
+    db_path = args.db or _default_db_path()
+    if not os.path.exists(db_path):
+        print(f"未找到状态数据库: {db_path}", file=sys.stderr)
+        return 1
+    # 只读打开，查询不会建表、导入 last_state.json 或写入数据库
+    store = HistoryReader(db_path)
+
+    if args.command == "companies":
+        for name in store.companies():
+            print(name)
+    elif args.command == "timeline":
+        for ts, position, status in store.timeline(
+            args.company, args.position, args.limit
+        ):
+            suffix = f" [{position}]" if position else ""
+            print(f"{_fmt_time(ts)}  {status}{suffix}")
+    elif args.command == "durations":
+        for position, status, start, seconds in store.stage_durations(
+            args.company, args.position
+        ):
+            suffix = f" [{position}]" if position else ""
+            print(
+                f"{_fmt_time(start)}  {_fmt_duration(seconds):>10}  {status}{suffix}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
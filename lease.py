@@ -0,0 +1,288 @@
+import copy
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from monitors.state import tagged_path
+from notifier import OUTBOX_FILE
+
+LEASE_DB = os.environ.get("LEASE_DB_PATH", "leases.db")
+
+
+def apply_lease(config: dict) -> dict:
+    """启用租约时调整配置（返回新的配置，不修改原配置）
+
+    多个副本共用同一目录：JSON 状态文件会被整体互相覆盖，因此固定使用 sqlite；
+    通知队列按副本名区分，避免两个副本改写同一个队列文件。
+    """
+    lease = config.get("lease", {})
+    if not lease.get("enabled"):
+        return config
+    config = copy.deepcopy(config)
+    state = config.setdefault("state", {})
+    if str(state.get("backend", "json")).lower() != "sqlite":
+        state["backend"] = "sqlite"
+        state.pop("path", None)
+    notification = config.setdefault("notification", {})
+    notification["outbox"] = tagged_path(
+        notification.get("outbox", OUTBOX_FILE), lease.get("name") or socket.gethostname()
+    )
+    return config
+
+
+class LeaseManager:
+    """基于 SQLite 的监控器租约，多个副本共用同一 /config 目录时保证同一公司只由一个副本检查
+
+    - 检查前在同一事务中为本轮公司申请租约：无人持有、已过期或本来就属于自己的才能拿到
+    - 各副本在 replicas 表中登记并随心跳续期；balance 为 True 时每个副本最多持有
+      ceil(公司数 / 存活副本数) 个租约，公司按份额分摊到所有副本
+    - 后台线程每 ttl/3 秒续约本副本持有的租约；有新副本加入、份额变小时，
+      超出份额的租约标记为待释放：不再检查这些公司，但继续续约，
+      直到 settle() 在本轮状态落盘后、且该公司没有检查正在进行时才释放，由持有较少的副本接手
+    - 副本退出时释放租约；异常退出时租约在 ttl 秒后过期，其余副本在下一次检查该公司时接手
+    - 从其他副本接手的公司先从状态库重新读取最新状态，不会按旧状态重复通知
+
+    租约到期时间使用墙上时钟，跨主机共享目录时各主机需要校时。
+    """
+
+    def __init__(
+        self,
+        path: str = LEASE_DB,
+        name: Optional[str] = None,
+        ttl: float = 60.0,
+        balance: bool = True,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.name = name or socket.gethostname()
+        # 同一主机上的多个进程也要区分，副本名后附加进程号
+        self.holder = f"{self.name}:{os.getpid()}"
+        self.ttl = float(ttl)
+        self.balance = balance
+        self._lock = threading.Lock()
+        # 本进程取得过租约的监控器（公司名 -> 监控器），用于判断检查是否仍在进行
+        self._monitors: Dict[str, object] = {}
+        # 超出份额、等待释放的公司
+        self._shedding: Set[str] = set()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                company TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS replicas (
+                holder TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+        with self._lock:
+            self._register(time.time())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name="lease", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, cfg: dict, worker: Optional[int] = None) -> Optional["LeaseManager"]:
+        """从 config.json 的 lease 字段构建，未启用时返回 None
+
+        {
+          "lease": {
+            "enabled": true,
+            "path": "leases.db",
+            "name": "replica-a",
+            "ttl": 60
+          }
+        }
+        name 默认为主机名，也用于区分各副本的通知队列文件。
+
+        worker 不为空时（分片模式）总是启用，副本名附加进程编号：分片变化后，
+        原进程检查完手头这一轮、释放迁出公司的租约之前，新进程不会开始检查这些公司。
+        分片已经决定了公司的归属，此时不按份额均衡。
+        """
+        lease = cfg.get("lease", {})
+        if worker is None and not lease.get("enabled"):
+            return None
+        name = lease.get("name")
+        if worker is not None:
+            name = f"{name or socket.gethostname()}-worker{worker}"
+        return cls(
+            path=lease.get("path", LEASE_DB),
+            name=name,
+            ttl=lease.get("ttl", 60),
+            balance=worker is None,
+        )
+
+    def claim(self, monitors: List, state_store) -> List:
+        """为这些监控器申请租约，返回本副本可以检查的监控器"""
+        if not monitors:
+            return []
+        now = time.time()
+        mine, taken = [], []
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._register(now)
+                mine_now = self._held(now)
+                share = self._share(now, {m.company_name for m in monitors})
+                for monitor in monitors:
+                    name = monitor.company_name
+                    if name in self._shedding:
+                        # 等待释放，不再检查
+                        continue
+                    row = self._conn.execute(
+                        "SELECT holder, expires_at FROM leases WHERE company = ?", (name,)
+                    ).fetchone()
+                    held = row is not None and row[0] == self.holder and row[1] >= now
+                    if row is not None and row[0] != self.holder and row[1] >= now:
+                        continue
+                    if not held and len(mine_now) >= share:
+                        # 已达到本副本的份额，留给其余副本
+                        continue
+                    mine_now.add(name)
+                    self._conn.execute(
+                        "INSERT INTO leases (company, holder, expires_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(company) DO UPDATE SET "
+                        "holder = excluded.holder, expires_at = excluded.expires_at",
+                        (name, self.holder, now + self.ttl),
+                    )
+                    mine.append(monitor)
+                    self._monitors[name] = monitor
+                    if not held:
+                        taken.append(name)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logging.error(f"申请租约失败，本轮跳过检查: {str(e)}")
+                return []
+
+        if taken:
+            logging.info(f"已取得租约: {', '.join(taken)}")
+            # 这些公司此前可能由其他副本检查，先接上对方保存的状态
+            state_store.reload(taken)
+        return mine
+
+    def settle(self, state_store) -> None:
+        """一轮检查结束后调用：释放待释放的租约
+
+        仍有检查在进行的公司（例如超时后仍未结束的线程、按需刷新）保留租约，下次再试；
+        释放前先落盘状态，接手的副本读取到的一定是最新状态，不会重复检查、重复通知。
+        """
+        with self._lock:
+            ready = sorted(
+                name
+                for name in self._shedding
+                if not getattr(self._monitors.get(name), "checking", False)
+            )
+        if not ready:
+            return
+        state_store.flush()
+        self.release(ready)
+        logging.info(f"副本增加，已释放超出份额的租约: {', '.join(ready)}")
+
+    def release(self, companies: Optional[List[str]] = None) -> None:
+        """释放指定公司（默认全部）的租约，其余副本可立即接手"""
+        with self._lock:
+            if companies is None:
+                self._shedding.clear()
+                self._monitors.clear()
+            else:
+                self._shedding.difference_update(companies)
+                for name in companies:
+                    self._monitors.pop(name, None)
+            try:
+                if companies is None:
+                    self._conn.execute("DELETE FROM leases WHERE holder = ?", (self.holder,))
+                else:
+                    self._conn.executemany(
+                        "DELETE FROM leases WHERE holder = ? AND company = ?",
+                        [(self.holder, name) for name in companies],
+                    )
+            except sqlite3.Error as e:
+                logging.error(f"释放租约失败: {str(e)}")
+
+    def close(self, release: bool = True) -> None:
+        """停止续约；release 为 False 时保留租约直到过期（--once 模式，在 ttl 内其余副本不再检查）"""
+        self._stop.set()
+        self._thread.join(timeout=5)
+        if release:
+            self.release()
+            with self._lock:
+                try:
+                    self._conn.execute("DELETE FROM replicas WHERE holder = ?", (self.holder,))
+                except sqlite3.Error as e:
+                    logging.error(f"注销副本失败: {str(e)}")
+        with self._lock:
+            self._conn.close()
+
+    # --- 内部方法（调用方持有 _lock） ---
+    def _register(self, now: float) -> None:
+        self._conn.execute(
+            "INSERT INTO replicas (holder, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(holder) DO UPDATE SET expires_at = excluded.expires_at",
+            (self.holder, now + self.ttl),
+        )
+
+    def _held(self, now: float) -> Set[str]:
+        return {
+            row[0]
+            for row in self._conn.execute(
+                "SELECT company FROM leases WHERE holder = ? AND expires_at >= ?",
+                (self.holder, now),
+            )
+        }
+
+    def _share(self, now: float, wanted: Set[str] = frozenset()) -> float:
+        """本副本最多持有的租约数：ceil(已知公司数 / 存活副本数)"""
+        if not self.balance:
+            return math.inf
+        live = self._conn.execute(
+            "SELECT COUNT(*) FROM replicas WHERE expires_at >= ?", (now,)
+        ).fetchone()[0]
+        known = wanted | {
+            row[0]
+            for row in self._conn.execute(
+                "SELECT company FROM leases WHERE expires_at >= ?", (now,)
+            )
+        }
+        return math.ceil(len(known) / max(live, 1))
+
+    def _heartbeat(self) -> None:
+        interval = max(self.ttl / 3, 1.0)
+        while not self._stop.wait(interval):
+            with self._lock:
+                try:
+                    now = time.time()
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._register(now)
+                    held = sorted(self._held(now))
+                    # 超出份额的租约只标记为待释放并继续续约，由 settle() 在安全时释放
+                    excess = set(held[int(min(len(held), self._share(now))):])
+                    added = excess - self._shedding
+                    self._shedding = excess
+                    self._conn.execute(
+                        "UPDATE leases SET expires_at = ? WHERE holder = ?",
+                        (now + self.ttl, self.holder),
+                    )
+                    self._conn.execute("COMMIT")
+                except sqlite3.Error as e:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                    logging.warning(f"续约失败，将在下次心跳重试: {str(e)}")
+                    continue
+            if added:
+                logging.info(
+                    f"副本增加，本轮结束后释放超出份额的租约: {', '.join(sorted(added))}"
+                )
@@ -0,0 +1,103 @@
+import atexit
+import datetime
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from typing import List, Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，便于日志系统采集与检索"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gz_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gz_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def create_file_handler(path: str, log_cfg: dict) -> logging.Handler:
+    """按 logging 配置创建文件 handler
+
+    - max_bytes：单个文件超过该大小时轮转
+    - when / interval：按时间轮转（如 "midnight"、"H"），与 max_bytes 同时配置时以 when 为准
+    - backup_count：保留的历史文件数（默认 5）
+    - compress：轮转出的历史文件用 gzip 压缩
+    都未配置时与原来一样写入单个文件、不轮转。
+    """
+    backup_count = int(log_cfg.get("backup_count", 5))
+    if log_cfg.get("when"):
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path,
+            when=log_cfg["when"],
+            interval=int(log_cfg.get("interval", 1)),
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
+    elif log_cfg.get("max_bytes"):
+        handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=int(log_cfg["max_bytes"]),
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
+    else:
+        return logging.FileHandler(path, encoding="utf-8")
+
+    if log_cfg.get("compress"):
+        handler.namer = _gz_namer
+        handler.rotator = _gz_rotator
+    return handler
+
+
+def start_queue(handlers: List[logging.Handler]) -> logging.Handler:
+    """由后台线程负责写出 handlers，返回挂到 root 上的 QueueHandler
+
+    调用日志的线程只把记录放入内存队列，磁盘写入、轮转与压缩都在监听线程中完成。
+    """
+    global _listener
+    stop_queue()
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    return logging.handlers.QueueHandler(log_queue)
+
+
+def stop_queue() -> None:
+    """写完队列中剩余的日志并停止监听线程（重新配置日志或进程退出时调用）"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop_queue)
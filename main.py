@@ -1,14 +1,36 @@
+import argparse
+import atexit
 import time
 import os
+import sys
 import json
 import logging
 import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from logsetup import JsonFormatter, create_file_handler, start_queue, stop_queue
 from monitors.registry import get_monitor_class
-import importlib
-import pkgutil
-import monitors as monitors_pkg
+from monitors.coalesce import configure_coalescer, get_coalescer
+from monitors.cookies import configure_cookie_store, flush_cookies
+from monitors.metrics import configure_metrics, dump_metrics, get_metrics
+from monitors.profiling import configure_profiling
+from monitors.ratelimit import configure_rate_limiter
+from monitors.state import configure_state_store
+from monitors.transport import configure_transport
+from notifier import build_channels, create_notifier
+from reloader import ConfigWatcher
+from runner import (
+    ConcurrentRunner,
+    RESULT_AUTH_FAILED,
+    RESULT_CHANGED,
+    RESULT_ERROR,
+    RESULT_LEASED,
+    RESULT_UNCHANGED,
+)
+from scheduler import Scheduler
+from statusapi import StatusAPI
+from lease import LeaseManager, apply_lease
+from tenants import Shard, expand_tenants
 
 # ----------------- 基础配置 -----------------
 CONFIG_FILE = os.environ.get("CONFIG_PATH", "config.json")
@@ -27,10 +49,18 @@ def setup_logging(cfg: Optional[dict] = None):
         "file_enabled": true,
         "file": "monitor.log",
         "level": "INFO",
-        "format": "%(asctime)s - %(levelname)s - %(message)s"
+        "format": "%(asctime)s - %(levelname)s - %(message)s",
+        "queue": false,
+        "json": false,
+        "max_bytes": 10485760,
+        "when": null,
+        "backup_count": 5,
+        "compress": false
       }
     }
     若未提供配置，则默认开启控制台与文件双输出，日志文件为 monitor.log。
+    queue 为 true 时日志由后台线程写出；json 为 true 时日志文件每行一条 JSON；
+    max_bytes（按大小）或 when（按时间）启用日志文件轮转，见 logsetup.create_file_handler。
     """
     log_cfg = (cfg or {}).get("logging", {})
 
@@ -46,8 +76,10 @@ def setup_logging(cfg: Optional[dict] = None):
     root.setLevel(level)
 
     # 清理已有 handler，避免重复添加
+    stop_queue()
     for h in list(root.handlers):
         root.removeHandler(h)
+        h.close()
 
     formatter = logging.Formatter(fmt)
 
@@ -67,7 +99,7 @@ def setup_logging(cfg: Optional[dict] = None):
                     f"日志路径 {log_file} 指向目录，无法创建日志文件"
                 )
             log_path.parent.mkdir(parents=True, exist_ok=True)
-            file_handler = logging.FileHandler(str(log_path), encoding="utf-8")
+            file_handler = create_file_handler(str(log_path), log_cfg)
         except (OSError, PermissionError) as exc:
             file_handler = None
             file_setup_error = exc
@@ -83,9 +115,16 @@ def setup_logging(cfg: Optional[dict] = None):
 
     if file_handler is not None:
         file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(JsonFormatter() if log_cfg.get("json") else formatter)
         root.addHandler(file_handler)
 
+    if log_cfg.get("queue") and root.handlers:
+        # 轮询线程只把日志放入队列，由后台线程写控制台与文件
+        handlers = list(root.handlers)
+        for h in handlers:
+            root.removeHandler(h)
+        root.addHandler(start_queue(handlers))
+
     if file_setup_error:
         root.warning(
             "日志文件无法写入（%s），已自动退回到控制台输出。请检查路径或目录权限。",
@@ -98,24 +137,55 @@ def setup_logging(cfg: Optional[dict] = None):
 
 
 # ----------------- 主程序 -----------------
-def main():
-
+def load_config(shard: Optional[Shard] = None) -> dict:
+    """读取配置并展开多用户（tenants）；分片模式下只保留本进程负责的公司，启用租约时按副本区分文件"""
     if not os.path.exists(CONFIG_FILE):
         raise FileNotFoundError(
             f"未找到配置文件: {CONFIG_FILE}。请检查路径或通过环境变量 CONFIG_PATH 指定。"
         )
 
     with open(CONFIG_FILE, encoding="utf-8") as f:
-        config = json.load(f)
-
-    # 初始化日志（支持 console/file/both）
-    setup_logging(config)
-
-    # 动态加载 monitors 下的所有模块，使其通过装饰器完成注册
-    for _finder, modname, _ispkg in pkgutil.iter_modules(monitors_pkg.__path__):
-        if modname in {"__init__", "registry", "base"}:
-            continue
-        importlib.import_module(f"monitors.{modname}")
+        config = apply_lease(expand_tenants(json.load(f)))
+    if shard is not None:
+        config = shard.apply(config, LOG_FILE)
+    return config
+
+
+def _notifier_key(config: dict) -> str:
+    """通知相关的配置，变化时需要重建通知器"""
+    tenants = {c.get("tenant") for c in config.get("companies", [])}
+    return json.dumps(
+        [
+            config.get("email"),
+            config.get("notification"),
+            config.get("channels"),
+            [
+                [t.get("email"), t.get("channels")]
+                for t in config.get("tenants") or []
+                if t["name"] in tenants
+            ],
+            sorted(t for t in tenants if t),
+        ],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+
+
+def _company_key(company: dict) -> str:
+    return json.dumps(company, sort_keys=True, ensure_ascii=False)
+
+
+def build_monitors(
+    config: dict, existing: Optional[List[Tuple[object, dict]]] = None
+) -> List[Tuple[object, dict]]:
+    """按配置创建监控器，返回 [(监控器, 公司配置), ...]
+
+    provider 在这里按名称首次使用时才导入，未配置的站点不会被加载。
+    existing 为重载前的监控器：公司配置完全相同的条目直接复用（保留 Session 与缓存）。
+    """
+    reusable: Dict[str, List[object]] = {}
+    for monitor, company in existing or []:
+        reusable.setdefault(_company_key(company), []).append(monitor)
 
     # 初始化监控器（支持 provider/名称映射）
     name_alias = {
@@ -125,76 +195,301 @@ def main():
         "MokaHR": "mokahr",
     }
 
-    monitors = []
+    entries = []
     for company in config["companies"]:
-        provider = company.get("provider") or name_alias.get(company.get("name"))
+        same = reusable.get(_company_key(company))
+        if same:
+            entries.append((same.pop(0), company))
+            continue
+        name = company.get("name")
+        if company.get("tenant") and name:
+            # 多用户条目的名称已被改为 "用户名/公司名"（见 tenants.expand_tenants），按原名称映射
+            name = name[len(company["tenant"]) + 1:]
+        provider = company.get("provider") or name_alias.get(name)
         cls = get_monitor_class(provider) if provider else None
         if cls is None:
             logging.warning(
                 f"未识别的 provider/name: {company.get('provider') or company.get('name')}，跳过该公司"
             )
             continue
-        monitors.append(cls(company))
+        try:
+            monitor = cls(company)
+        except (KeyError, ValueError) as e:
+            logging.warning(f"{company.get('name')} 配置有误（{str(e)}），跳过该公司")
+            continue
+        entries.append((monitor, company))
+    return entries
+
+
+def run_round(
+    runner, monitors, notifier, state_store, transport, leases=None
+) -> Dict[str, str]:
+    """执行一轮检查并落盘状态，返回 {公司名: 结果}
+
+    启用租约时只检查本副本取得租约的公司，其余公司的结果为 leased。
+    """
+    leased: Dict[str, str] = {}
+    if leases is not None:
+        mine = leases.claim(monitors, state_store)
+        leased = {m.company_name: RESULT_LEASED for m in monitors if m not in mine}
+        monitors = mine
+        if leased:
+            logging.debug(f"由其他副本检查: {', '.join(leased)}")
+        if not monitors:
+            leases.settle(state_store)
+            return leased
+
+    now = datetime.datetime.now()
+    logging.info(
+        f"=== 开始本轮检查 {now.strftime('%Y-%m-%d %H:%M')}，"
+        f"共 {len(monitors)} 家公司 ==="
+    )
+
+    # 合并的请求结果只在本轮内复用，每轮都重新请求上游
+    get_coalescer().new_round()
+    metrics = get_metrics()
+    # 并发执行监控器的检查，单个站点超时不会拖住整轮
+    with metrics.timer("offerchecker_round_seconds"):
+        results = runner.run_round(monitors, notifier)
+    results.update(leased)
+    for monitor in monitors:
+        metrics.inc(
+            "offerchecker_checks_total",
+            provider=monitor.provider_name,
+            result=results.get(monitor.company_name, RESULT_ERROR),
+        )
+    failed = [
+        name
+        for name, r in results.items()
+        # 凭据失效已单独通知过，不再每轮重复告警
+        if r not in {RESULT_CHANGED, RESULT_UNCHANGED, RESULT_AUTH_FAILED, RESULT_LEASED}
+    ]
+    if failed:
+        logging.warning(f"本轮未成功完成的公司: {', '.join(failed)}")
+    hits = sum(m.cache_hits for m in monitors)
+    misses = sum(m.cache_misses for m in monitors)
+    logging.debug(f"响应指纹缓存累计命中 {hits} 次，未命中 {misses} 次")
+    for host, st in transport.stats().items():
+        logging.debug(
+            f"HTTP {host}: 请求 {st['requests']} 次，失败 {st['errors']} 次，"
+            f"平均耗时 {st['avg_latency'] * 1000:.0f}ms"
+        )
+
+    # 本轮的状态改动一次性落盘
+    with metrics.phase("state_io"):
+        state_store.flush()
+        flush_cookies()
+    if leases is not None:
+        # 状态已落盘，超出份额的租约此时可以安全释放
+        leases.settle(state_store)
+    metrics.set("offerchecker_notification_queue", notifier.queue_depth())
+    dump_metrics()
+    return results
+
+
+# 修改后需要重启进程才能生效的配置项
+_RESTART_KEYS = (
+    "state",
+    "http",
+    "rate_limit",
+    "coalesce",
+    "metrics",
+    "api",
+    "lease",
+    "cookies",
+    "profiling",
+)
+
+
+def reload_config(
+    config, entries, scheduler, runner, notifier, state_store, shard=None, leases=None
+):
+    """重新加载配置，只重建发生变化的公司，返回 (config, entries, notifier)
+
+    在两轮检查之间由主循环调用，因此不会与正在进行的检查交错。
+    分片模式下分片文件变化（工作进程增减）也通过这里重新分配公司。
+    启用租约时，移除或迁出的公司会立即释放租约。
+    """
+    try:
+        new_config = load_config(shard)
+        new_config["companies"]
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"重新加载配置失败，继续使用原配置: {str(e)}")
+        return config, entries, notifier
+
+    if new_config.get("logging") != config.get("logging"):
+        setup_logging(new_config)
+
+    # 新接手的公司（可能刚从其他工作进程迁移过来）先读取最新保存的状态
+    old_names = {c.get("name") for _m, c in entries}
+    state_store.reload(
+        [c.get("name") for c in new_config["companies"] if c.get("name") not in old_names]
+    )
+    if leases is not None:
+        # 不再由本进程负责的公司立即释放租约，其余副本无需等待过期
+        new_names = {c.get("name") for c in new_config["companies"]}
+        leases.release([name for name in old_names if name not in new_names])
+
+    old_keys = {_company_key(c) for _m, c in entries}
+    new_entries = build_monitors(new_config, existing=entries)
+    new_keys = {_company_key(c) for _m, c in new_entries}
+    scheduler.update(new_config, new_entries)
+
+    if new_config.get("concurrency") != config.get("concurrency"):
+        fresh = ConcurrentRunner.from_config(new_config)
+        runner.max_workers, runner.timeout = fresh.max_workers, fresh.timeout
+
+    if _notifier_key(new_config) != _notifier_key(config):
+        try:
+            build_channels(new_config)
+        except (KeyError, ValueError) as e:
+            logging.error(f"通知渠道配置有误，继续使用原通知配置: {str(e)}")
+        else:
+            # 旧分发器停止后未投递的通知仍在队列文件中，由新分发器继续发送
+            notifier.close()
+            notifier = create_notifier(new_config, worker=shard and shard.worker)
+
+    for key in _RESTART_KEYS:
+        if new_config.get(key) != config.get(key):
+            logging.warning(f"配置项 {key} 的修改需要重启后生效")
+
+    logging.info(
+        f"配置已重新加载：新增/变更 {len(new_keys - old_keys)} 家，"
+        f"移除 {len(old_keys - new_keys)} 家，共 {len(new_entries)} 家"
+    )
+    return new_config, new_entries, notifier
+
+
+def main(argv=None) -> int:
+    started = time.monotonic()
+    parser = argparse.ArgumentParser(description="投递状态监控")
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="立即检查所有公司一轮后退出（适合 cron 或一次性容器），有公司检查失败时退出码为 1",
+    )
+    parser.add_argument(
+        "--worker", type=int, help="分片模式下的工作进程编号（由 supervisor.py 传入）"
+    )
+    parser.add_argument("--shard-file", help="分片文件路径（由 supervisor.py 传入）")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="开启性能剖析（等同 profiling.enabled），每轮的 CPU 与内存报告写入配置目录下的 profiles",
+    )
+    args = parser.parse_args(argv)
+
+    shard = None
+    if args.worker is not None and args.shard_file:
+        shard = Shard(args.worker, args.shard_file)
+    config = load_config(shard)
+
+    # 初始化日志（支持 console/file/both）
+    setup_logging(config)
+
+    # 初始化状态存储（json / sqlite），监控器创建时会引用它
+    state_store = configure_state_store(config)
+    # 初始化共享 HTTP 传输层（连接池、超时、重试），监控器的 Session 挂载在其上
+    transport = configure_transport(config)
+    # 按主机限流，同一站点的多个公司条目共享令牌桶
+    configure_rate_limiter(config)
+    # 合并相同账号、相同请求的上游调用
+    configure_coalescer(config)
+    # Cookie 罐：合并服务器下发的 Cookie 并持久化，重启后继续使用
+    configure_cookie_store(config)
+    # 各阶段耗时与计数，可通过 HTTP 或文件以 Prometheus 格式输出
+    configure_metrics(config)
+    # 多个副本共用同一目录时（以及分片模式下公司迁移期间），按公司租约避免重复检查与重复通知
+    leases = LeaseManager.from_config(config, worker=shard and shard.worker)
+    # 可选的性能剖析：采样调用栈与 tracemalloc 快照，定期写出报告；
+    # 共用配置目录的进程（分片、多副本）按副本名区分报告，各自只清理自己的
+    profiler = configure_profiling(
+        config,
+        out_dir=str(Path(CONFIG_FILE).resolve().parent / "profiles"),
+        force=args.profile,
+        tag=leases.name if leases is not None else "",
+    )
+
+    entries = build_monitors(config)
+    monitors = [monitor for monitor, _company in entries]
+
+    runner = ConcurrentRunner.from_config(config)
+    # 邮件在后台线程中复用同一 SMTP 连接发送，不阻塞轮询；多用户时每个用户一个分发器
+    notifier = create_notifier(config, worker=shard and shard.worker)
+
+    if args.once:
+        logging.info(f"启动耗时 {(time.monotonic() - started) * 1000:.0f}ms")
+        with profiler.round():
+            results = run_round(runner, monitors, notifier, state_store, transport, leases)
+        # 等待本轮通知发出；未发出的保留在通知队列文件中，下次运行继续发送
+        notifier.drain(timeout=runner.timeout)
+        notifier.close(timeout=5)
+        if leases is not None:
+            leases.close(release=False)
+        ok = all(
+            r in {RESULT_CHANGED, RESULT_UNCHANGED, RESULT_LEASED} for r in results.values()
+        )
+        return 0 if ok else 1
+
+    # 每家公司独立的轮询间隔与工作时段
+    scheduler = Scheduler.from_config(config, entries)
+    # 配置文件变化或收到 SIGHUP 时热重载
+    watcher = ConfigWatcher.from_config(
+        CONFIG_FILE, config, extra_paths=[args.shard_file] if shard else ()
+    )
+    if leases is not None:
+        # 正常退出时释放租约，其余副本无需等待过期即可接手
+        atexit.register(leases.close)
+    # 可选的状态查询接口，从缓存读取，按需刷新受合并与限速约束
+    api = StatusAPI.from_config(config, state_store, leases)
+    if api is not None:
+        api.update(monitors, notifier)
+        api.start()
+
+    # 已在日志中提示过的休眠目标（单调时钟），避免分段休眠时重复输出
+    announced = None
 
-    WORK_HOURS = config["WORK_HOURS"]
     # 启动监控循环
     while True:
-        now = datetime.datetime.now()
-        current_hour = now.hour
-
-        # 判断是否在工作时间段内
-        if WORK_HOURS["start_hour"] <= current_hour < WORK_HOURS["end_hour"]:
-            logging.info(f"=== 开始本轮检查 {now.strftime('%Y-%m-%d %H:%M')} ===")
-
-            # 执行所有监控器检查
-            for monitor in monitors:
-                if monitor.login():
-                    monitor.check_update(config["email"])
-                else:
-                    logging.warning(f"{monitor.company_name} 登录失败")
-
-            # 计算下一轮检查时间（1小时后或工作时段结束）
-            next_check = now + datetime.timedelta(hours=1)
-            if next_check.hour >= WORK_HOURS["end_hour"]:
-                # 如果下一轮超出工作时间，直接休眠到次日
-                sleep_seconds = (
-                    datetime.datetime.combine(
-                        now.date() + datetime.timedelta(days=1),
-                        datetime.time(WORK_HOURS["start_hour"]),
-                    )
-                    - now
-                ).total_seconds()
-            else:
-                # 否则正常间隔1小时
-                sleep_seconds = config["sleep_seconds"]
-
-            logging.info(
-                f"本轮检查完成，下次检查时间: {next_check.strftime('%Y-%m-%d %H:%M')}"
+        if watcher.changed():
+            config, entries, notifier = reload_config(
+                config, entries, scheduler, runner, notifier, state_store, shard, leases
             )
-            time.sleep(sleep_seconds)
-
-        else:
-            # 非工作时间计算休眠到次日开始时间
-            if current_hour >= WORK_HOURS["end_hour"]:
-                next_day = now + datetime.timedelta(days=1)
-                next_check_time = datetime.datetime(
-                    next_day.year,
-                    next_day.month,
-                    next_day.day,
-                    WORK_HOURS["start_hour"],
-                )
-            else:
-                next_check_time = datetime.datetime(
-                    now.year, now.month, now.day, WORK_HOURS["start_hour"]
-                )
+            if api is not None:
+                api.update([monitor for monitor, _company in entries], notifier)
+
+        due = scheduler.pop_due()
+        if not due:
+            wait = scheduler.time_until_next()
+            if wait is None:
+                # 没有可监控的公司时等待配置变更
+                wait = watcher.poll_seconds
+            elif wait > 60:
+                target = time.monotonic() + wait
+                if announced is None or abs(target - announced) > 1:
+                    announced = target
+                    next_time = datetime.datetime.now() + datetime.timedelta(seconds=wait)
+                    logging.info(f"休眠至 {next_time.strftime('%Y-%m-%d %H:%M')}")
+            # 分段休眠，以便及时发现配置变更
+            time.sleep(min(wait, watcher.poll_seconds))
+            continue
 
-            sleep_seconds = (next_check_time - now).total_seconds()
-            logging.info(
-                f"非工作时间，休眠至 {next_check_time.strftime('%Y-%m-%d %H:%M')}"
+        now = datetime.datetime.now()
+        with profiler.round():
+            results = run_round(runner, due, notifier, state_store, transport, leases)
+
+        # 根据结果调整各公司的下一次检查时间
+        for monitor in due:
+            result = results.get(monitor.company_name, RESULT_ERROR)
+            delay = scheduler.reschedule(monitor, result)
+            next_time = now + datetime.timedelta(seconds=delay)
+            # 由其他进程检查的公司会频繁重试申请租约，不在 INFO 级别刷屏
+            logging.log(
+                logging.DEBUG if result == RESULT_LEASED else logging.INFO,
+                f"{monitor.company_name} 下次检查时间: {next_time.strftime('%Y-%m-%d %H:%M')}",
             )
-            time.sleep(sleep_seconds)
 
 
 if __name__ == "__main__":
     print("Starting monitor...")
-    main()
+    sys.exit(main())
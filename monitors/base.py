@@ -1,26 +1,106 @@
+import hashlib
 import json
 import logging
-import os
-from pathlib import Path
-import requests
-import smtplib
-from email.mime.text import MIMEText
+import time
+import threading
+from urllib.parse import urlsplit
+from monitors.coalesce import get_coalescer
+from monitors.cookies import get_cookie_store, jar_key
+from monitors.health import (
+    DEFAULT_PROBE_INTERVAL,
+    AuthError,
+    CredentialBreaker,
+    claim_auth_notice,
+    clear_auth_notice,
+    looks_like_auth_failure,
+)
+from monitors.metrics import get_metrics
+from monitors.profiling import get_profiler
+from monitors.ratelimit import get_rate_limiter
+from monitors.state import get_state_store
+from monitors.transport import get_transport
 
-STATE_FILE = os.environ.get("STATE_FILE_PATH", "last_state.json")
+
+def diff_records(old, new):
+    """一次遍历比较新旧投递记录集合 {投递ID: {"title", "stage"}}
+
+    返回 (added, removed, changed)，changed 为 [(旧记录, 新记录), ...]
+    """
+    old = old if isinstance(old, dict) else {}
+    added, changed = [], []
+    for key, record in new.items():
+        prev = old.get(key)
+        if prev is None:
+            added.append(record)
+        elif prev != record:
+            changed.append((prev, record))
+    removed = [record for key, record in old.items() if key not in new]
+    return added, removed, changed
+
+
+def format_diff(added, removed, changed):
+    lines = [f"新增投递：{r['title']} - {r['stage']}" for r in added]
+    lines += [f"{new['title']}：{old['stage']} → {new['stage']}" for old, new in changed]
+    lines += [f"投递已移除：{r['title']}" for r in removed]
+    return "\n".join(lines)
 
 
 class CompanyMonitor:
+    # 注册时由 register_monitor 设置
+    provider_name = None
+    # 站点接口的默认地址（协议 + 主机），可被公司条目中的 base_url 覆盖
+    default_base_url = None
+    # 表示登录态失效的业务码（401/403 之外），可被公司条目中的 auth_codes 覆盖
+    auth_codes = ()
+
     def __init__(self, config):
         # 通用自定义配置字段，供各 Provider 按需读取，避免直接暴露完整 config
         self.extra = config.get("extra", {})
         self.company_name = config.get("name")
         self.position_id = config.get("position_id")
+        # 跟踪该站点的全部投递，而不是 position_id 对应的一条
+        self.track_all = bool(config.get("track_all", False))
+        # 覆盖接口地址，例如指向本地替身服务器（bench/standin.py）
+        self.base_url = (config.get("base_url") or self.default_base_url or "").rstrip("/")
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         }
-        self.session = requests.Session()
+        # 独立的 Session（Cookie 隔离），底层连接池、超时与重试由共享传输层提供
+        self.session = get_transport().session()
+        self.rate_limiter = get_rate_limiter()
+        self.coalescer = get_coalescer()
+        # 各阶段耗时与计数，按 provider 区分
+        self.metrics = get_metrics()
+        # 进程内共享的状态缓存，由主循环在每轮结束后统一落盘
+        self.state_store = get_state_store()
         # 顶层 headers 统一鉴权（包含 Cookie/Authorization 等）
         self.headers.update(config.get("headers", {}))
+        # 配置中的凭据，用于判断是否更换了凭据
+        self._credentials = dict(self.headers)
+        # Cookie 改由持久化的 Cookie 罐发送，服务器续期的 Cookie 在重启后仍然有效
+        self._cookie_key = None
+        self._attach_cookies()
+        # 响应指纹缓存：响应未变化时直接复用上次解析结果
+        # 以 slot 区分同一监控器的多个请求（如分页），默认 slot 为 None
+        self._fingerprints = {}
+        self._validators = {}
+        self._parsed = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 本次解析中花在解码上的时间，用于从解析耗时中扣除得到提取耗时
+        self._decode_elapsed = 0.0
+        # 最近一次成功查询的时间（Unix 时间戳），尚未查询过时为 None
+        self.last_checked = None
+        # 同一监控器的检查串行进行（主循环与状态查询接口的按需刷新可能同时触发）
+        self._check_lock = threading.Lock()
+        # 本次检查是否必须请求上游（见 check_update 的 fresh 参数）
+        self._fresh = False
+        # 凭据失效熔断：失效后停止轮询，仅低频试探
+        self.auth_codes = tuple(config.get("auth_codes", self.auth_codes))
+        self.breaker = CredentialBreaker(
+            config.get("auth_probe_interval", DEFAULT_PROBE_INTERVAL)
+        )
+        self._restore_breaker()
 
     def login(self):
         raise NotImplementedError
@@ -28,56 +108,291 @@ class CompanyMonitor:
     def fetch_status(self):
         raise NotImplementedError
 
-    def send_email(self, new_status, email_config):
-        msg = MIMEText(f"{self.company_name}状态更新：{new_status}", "plain", "utf-8")
-        msg["Subject"] = f"[校招状态] {self.company_name} 进度更新"
-        msg["From"] = email_config["sender"]
-        msg["To"] = email_config["receiver"]
+    def throttle(self, url):
+        """请求前调用：按目标主机限流"""
+        self.rate_limiter.acquire(url, self.provider_name)
+
+    def request_shared(self, method, url, key_url=None, **kwargs):
+        """发送请求并检查状态码
 
+        (provider, 方法, 地址, 请求头, 请求体) 相同的请求会被合并：同一账号在配置中出现多次
+        （例如关注不同 position_id）时，一轮只产生一次上游调用。
+        key_url 用于去掉地址中每次都变化的部分（如时间戳参数）。
+        """
+        headers = kwargs.get("headers") or {}
+        key = (
+            self.provider_name,
+            method.upper(),
+            key_url or url,
+            tuple(sorted(headers.items())),
+            self._cookie_key,
+            json.dumps(kwargs.get("json"), sort_keys=True, ensure_ascii=False),
+        )
+
+        def send():
+            self.throttle(url)
+            with self.metrics.phase("fetch", self.provider_name):
+                response = self.session.request(method, url, **kwargs)
+            if response.status_code in (401, 403):
+                raise AuthError(f"HTTP {response.status_code}")
+            response.raise_for_status()
+            # 提前读取完整响应体，之后可安全地被多个监控器共享
+            response.content
+            return response
+
+        return self.coalescer.do(key, send, reuse=not self._fresh)
+
+    def decode_shared(self, response, decode):
+        """对响应体做解码（JSON 解析、解密等），相同响应体只解码一次"""
+        digest = hashlib.sha1(response.content).hexdigest()
+        started = time.perf_counter()
         try:
-            with smtplib.SMTP_SSL(email_config["smtp_server"], 465) as server:
-                server.login(email_config["sender"], email_config["password"])
-                server.sendmail(
-                    email_config["sender"], [email_config["receiver"]], msg.as_string()
-                )
-                server.quit()
-            logging.info(f"邮件发送成功 - {self.company_name}")
-        except Exception as e:
-            logging.error(f"邮件发送失败: {str(e)}")
+            return self.coalescer.do(
+                ("decode", self.provider_name, digest), lambda: decode(response)
+            )
+        finally:
+            elapsed = time.perf_counter() - started
+            self._decode_elapsed += elapsed
+            self.metrics.observe(
+                "offerchecker_phase_seconds",
+                elapsed,
+                phase="decode",
+                provider=self.provider_name,
+            )
+
+    def conditional_headers(self, slot=None):
+        """请求头 + 上次响应的 ETag/Last-Modified 条件请求头"""
+        validators = self._validators.get(slot)
+        if not validators:
+            return self.headers
+        return {**self.headers, **validators}
+
+    def parse_cached(self, response, parse, slot=None):
+        """按响应指纹缓存解析结果
 
-    def check_update(self, email_config):
+        指纹优先取 ETag/Last-Modified，否则为响应体的 SHA-1；
+        指纹与上次相同（或服务器返回 304）时跳过 JSON 解析、解密与提取。
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        previous = self._fingerprints.get(slot)
+        if response.status_code == 304 and previous is not None:
+            fingerprint = previous
+        elif etag or last_modified:
+            fingerprint = f"{etag}|{last_modified}"
+        else:
+            fingerprint = hashlib.sha1(response.content).hexdigest()
+
+        if fingerprint == previous:
+            self.cache_hits += 1
+            self.metrics.inc("offerchecker_cache_hits_total", provider=self.provider_name)
+            return self._parsed[slot]
+
+        self.cache_misses += 1
+        self.metrics.inc("offerchecker_cache_misses_total", provider=self.provider_name)
+        self._decode_elapsed = 0.0
+        started = time.perf_counter()
         try:
-            current_status = self.fetch_status()
+            parsed = parse(response)
+        finally:
+            # 提取耗时 = 解析总耗时 - 其中的解码（JSON 解析、解密）耗时
+            self.metrics.observe(
+                "offerchecker_phase_seconds",
+                max(0.0, time.perf_counter() - started - self._decode_elapsed),
+                phase="extract",
+                provider=self.provider_name,
+            )
+        self._fingerprints[slot] = fingerprint
+        self._parsed[slot] = parsed
+        validators = {}
+        if etag:
+            validators["If-None-Match"] = etag
+        if last_modified:
+            validators["If-Modified-Since"] = last_modified
+        self._validators[slot] = validators
+        return parsed
+
+    def check_auth(self, code=None, message=None):
+        """接口返回业务错误时调用：若判断为登录态失效则抛出 AuthError"""
+        if looks_like_auth_failure(code, self.auth_codes):
+            raise AuthError(f"{message} (code={code})")
+
+    def empty_status(self):
+        """没有有效投递时的状态"""
+        logging.warning("没有有效的投递记录")
+        return {} if self.track_all else "无有效投递"
+
+    def select_status(self, valid_records, id_key, summarize, format_status):
+        """从有效投递记录中取出本监控器关心的状态
+
+        - track_all：返回 {投递ID: summarize(记录)}，覆盖全部投递
+        - 否则按 position_id（缺省第一条）取一条，返回 format_status(记录)
+        """
+        if not valid_records:
+            return self.empty_status()
+
+        if self.track_all:
+            return {str(item[id_key]): summarize(item) for item in valid_records}
+
+        if self.position_id:
+            target_record = next(
+                (item for item in valid_records if item[id_key] == self.position_id),
+                None,
+            )
+            if not target_record:
+                logging.warning(f"未找到ID为{getattr(self, 'target_position_id', self.position_id)}的岗位")
+                return None
+        else:
+            target_record = valid_records[0]
+
+        return format_status(target_record)
+
+    def notify(self, new_status, notifier):
+        """通知状态变化：交给通知器入队，由各渠道的后台线程异步发送"""
+        notifier.notify(self.company_name, new_status)
+
+    @property
+    def checking(self):
+        """是否有检查正在进行（主循环、超时仍未结束的线程或状态查询接口的按需刷新）"""
+        return self._check_lock.locked()
+
+    def check_update(self, notifier, fresh=False):
+        """检查一次状态：有变化返回 True，无变化返回 False，查询失败返回 None
+
+        fresh 为 True 时（状态查询接口的按需刷新）不复用本轮已合并的请求结果，一定请求上游。
+        """
+        with self._check_lock:
+            self._fresh = fresh
+            try:
+                return self._check_update(notifier)
+            finally:
+                self._fresh = False
+
+    def _check_update(self, notifier):
+        if not self.breaker.allow():
+            logging.debug(f"{self.company_name} 凭据已失效，跳过本次检查")
+            return None
+        try:
+            started = time.monotonic()
+            try:
+                # 开启性能剖析时，本线程的调用栈与内存分配按 provider 归类
+                with get_profiler().track(self.provider_name, type(self).__module__):
+                    current_status = self.fetch_status()
+            except AuthError as e:
+                self._on_auth_failure(e, notifier)
+                return None
+            latency = time.monotonic() - started
+            if current_status is not None:
+                self.last_checked = time.time()
+            if current_status is not None and self.breaker.record_success():
+                logging.info(f"{self.company_name} 凭据已恢复，恢复正常轮询")
+                self.state_store.delete(self._auth_key())
+                clear_auth_notice(self.account_key())
+            if isinstance(current_status, dict):
+                return self._check_records(current_status, notifier, latency)
+            if current_status is not None:
+                with self.metrics.phase("state_io", self.provider_name):
+                    self.state_store.record(
+                        self.company_name,
+                        self.position_id,
+                        current_status,
+                        latency=latency,
+                    )
             last_status = self.load_last_state()
             logging.info(
                 f"{self.company_name} 当前状态: {current_status}, 上次状态: {last_status}"
             )
+            if current_status is None:
+                # 查询失败，返回 None 以便与“无变化”区分
+                return None
             if current_status and current_status != last_status:
-                self.send_email(current_status, email_config)
+                # 先记录新状态，再交给通知队列；通知投递失败由队列负责重试
                 self.save_current_state(current_status)
+                self.notify(current_status, notifier)
                 return True
             return False
         except Exception as e:
             logging.error(f"检查失败: {str(e)}")
-            return False
+            return None
 
     def load_last_state(self):
-        state_path = Path(STATE_FILE)
-        if not state_path.exists():
-            return None
-        with state_path.open("r", encoding="utf-8") as f:
-            states = json.load(f)
-            return states.get(self.company_name, None)
+        with self.metrics.phase("state_io", self.provider_name):
+            return self.state_store.get(self.company_name)
 
     def save_current_state(self, status):
-        state_path = Path(STATE_FILE)
-        states = {}
-        if state_path.exists():
-            with state_path.open("r", encoding="utf-8") as f:
-                states = json.load(f)
-        states[self.company_name] = status
-        state_path.parent.mkdir(parents=True, exist_ok=True)
-        with state_path.open("w", encoding="utf-8") as f:
-            json.dump(states, f, ensure_ascii=False)
+        with self.metrics.phase("state_io", self.provider_name):
+            self.state_store.set(self.company_name, status)
+
+    def account_key(self):
+        """账号标识：与 Cookie 罐及请求合并的粒度一致（站点 + 配置中的凭据）
+
+        调度器让同一账号的条目同时到期，以便共用一次上游请求。
+        """
+        return self._cookie_key or f"{self.provider_name}|{self._credentials_hash()}"
 
     # --- 内部方法 ---
+    def _auth_key(self):
+        return f"{self.company_name}#auth"
+
+    def _credentials_hash(self):
+        return hashlib.sha1(
+            json.dumps(self._credentials, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _attach_cookies(self):
+        store = get_cookie_store()
+        host = urlsplit(self.base_url).hostname
+        if store is None or not host:
+            return
+        seed = ""
+        for name in [h for h in self.headers if h.lower() == "cookie"]:
+            seed = self.headers.pop(name)
+        # 同一站点、同一组凭据的监控器共用一个罐（与请求合并的粒度一致）
+        self._cookie_key = jar_key(
+            self.provider_name, host, json.dumps(self._credentials, sort_keys=True)
+        )
+        store.attach(self.session, self._cookie_key, host, seed)
+
+    def _restore_breaker(self):
+        """重启后恢复熔断状态；更换了凭据（headers 变化）则重新开始"""
+        saved = self.state_store.get(self._auth_key())
+        if saved and saved.get("credentials") == self._credentials_hash():
+            self.breaker.restore(saved["since"])
+        else:
+            # 凭据已更换，或是早期版本恢复后留下的空值
+            self.state_store.delete(self._auth_key())
+
+    def _on_auth_failure(self, error, notifier):
+        if not self.breaker.record_auth_failure():
+            logging.debug(f"{self.company_name} 凭据仍然无效: {str(error)}")
+            return
+        logging.warning(
+            f"{self.company_name} 凭据已失效，暂停轮询，每 "
+            f"{self.breaker.probe_interval / 3600:g} 小时试探一次: {str(error)}"
+        )
+        self.state_store.set(
+            self._auth_key(),
+            {"credentials": self._credentials_hash(), "since": self.breaker.opened_at},
+        )
+        # 同一账号的多个条目只提醒一次
+        if claim_auth_notice(self.account_key()):
+            self.notify("登录凭据已失效，请重新登录并更新配置中的 Cookie/Authorization", notifier)
+
+    def _check_records(self, records, notifier, latency):
+        """track_all 模式：按投递ID比较新旧记录集合"""
+        with self.metrics.phase("state_io", self.provider_name):
+            for key, record in records.items():
+                self.state_store.record(
+                    self.company_name, key, record["stage"], latency=latency
+                )
+        last_records = self.load_last_state()
+        added, removed, changed = diff_records(last_records, records)
+        logging.info(
+            f"{self.company_name} 共 {len(records)} 条投递，新增 {len(added)}，"
+            f"变化 {len(changed)}，移除 {len(removed)}"
+        )
+        if not (added or removed or changed):
+            return False
+        self.save_current_state(records)
+        self.notify(format_diff(added, removed, changed), notifier)
+        return True
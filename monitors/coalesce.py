@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished = 0.0
+
+
+class RequestCoalescer:
+    """请求合并（single-flight）
+
+    相同 key 的调用：
+    - 并发进行时只执行一次，其余调用方等待并共享结果（或异常）
+    - 成功完成的结果在本轮内（且不超过 window 秒）可被复用，覆盖同一轮中先后检查的监控器；
+      new_round() 清空已完成的结果，下一轮必定重新请求，不会错过两轮之间的变化
+    异常不会被缓存。
+    """
+
+    def __init__(self, window: float = 300.0):
+        self.window = float(window)
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.shared = 0
+        self.executed = 0
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict] = None) -> "RequestCoalescer":
+        """从 config.json 的 coalesce 字段构建
+
+        {
+          "coalesce": {
+            "window": 300
+          }
+        }
+        window 为 0 时只合并并发中的请求；无论 window 多大，结果都不会跨轮复用。
+        """
+        c = (cfg or {}).get("coalesce", {})
+        return cls(window=c.get("window", 300))
+
+    def do(self, key: Hashable, fn: Callable[[], Any], reuse: bool = True) -> Any:
+        """reuse 为 False 时不复用已完成的结果（仍会加入进行中的调用），新结果替换旧结果"""
+        with self._lock:
+            self._evict()
+            call = self._calls.get(key)
+            if call is not None and not reuse and call.done.is_set():
+                call = None
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            raise
+        finally:
+            call.finished = time.monotonic()
+            call.done.set()
+        return call.value
+
+    def new_round(self) -> None:
+        """新一轮开始：丢弃上一轮已完成的结果（进行中的调用不受影响）"""
+        with self._lock:
+            for k in [k for k, c in self._calls.items() if c.done.is_set()]:
+                del self._calls[k]
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [
+            k
+            for k, c in self._calls.items()
+            if c.done.is_set() and now - c.finished >= self.window
+        ]
+        for k in expired:
+            del self._calls[k]
+
+
+_default_coalescer: Optional[RequestCoalescer] = None
+_default_lock = threading.Lock()
+
+
+def configure_coalescer(cfg: Optional[dict] = None) -> RequestCoalescer:
+    """按配置初始化共享的请求合并器，需在创建监控器之前调用"""
+    global _default_coalescer
+    with _default_lock:
+        _default_coalescer = RequestCoalescer.from_config(cfg)
+        return _default_coalescer
+
+
+def get_coalescer() -> RequestCoalescer:
+    """获取共享的请求合并器（未配置时使用默认窗口）"""
+    global _default_coalescer
+    with _default_lock:
+        if _default_coalescer is None:
+            _default_coalescer = RequestCoalescer()
+        return _default_coalescer
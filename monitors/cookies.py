@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from requests.cookies import RequestsCookieJar, create_cookie
+
+from monitors.state import atomic_write_text
+
+COOKIE_FILE = os.environ.get("COOKIE_FILE_PATH", "cookies.json")
+
+# 保存到文件中的 Cookie 属性
+_FIELDS = ("name", "value", "domain", "path", "secure", "expires")
+
+# 仍在使用的罐每隔多少秒刷新一次文件中的使用时间（used）
+_TOUCH_INTERVAL = 86400
+
+
+def parse_cookie_header(value: str) -> List[Tuple[str, str]]:
+    """把 "a=1; b=2" 形式的 Cookie 请求头拆成 [(名称, 值), ...]"""
+    pairs = []
+    for part in str(value).split(";"):
+        name, sep, val = part.strip().partition("=")
+        if sep and name:
+            pairs.append((name.strip(), val.strip()))
+    return pairs
+
+
+def jar_key(provider: str, host: str, credentials: str) -> str:
+    """Cookie 罐的键：同一站点、同一组配置凭据（即同一账号）的监控器共用一个罐
+
+    配置中的 Cookie 等凭据更换后键随之变化，旧罐不再使用。
+    """
+    return hashlib.sha1(f"{provider}|{host}|{credentials}".encode("utf-8")).hexdigest()[:16]
+
+
+def _drop_conflicts(jar: RequestsCookieJar, cookie) -> None:
+    """删除与 cookie 同名但 domain/path 不同的旧条目，避免同一名称被发送两次"""
+    for old in list(jar):
+        if old.name == cookie.name and (old.domain, old.path) != (cookie.domain, cookie.path):
+            jar.clear(old.domain, old.path, old.name)
+
+
+def _last_used(entry: dict) -> float:
+    # 早期版本的文件只有 updated 字段
+    return entry.get("used", entry.get("updated", 0))
+
+
+class CookieStore:
+    """持久化的 Cookie 罐
+
+    - 配置中的 Cookie 请求头作为初始值写入罐中（域名为站点主机），之后随请求自动发送
+    - 服务器通过 Set-Cookie 下发的新 Cookie 合并进罐，同名的旧值被替换
+    - flush() 仅在有改动时落盘（先读取文件合并其他进程的改动，再原子替换），
+      启动时按键恢复，Cookie 续期后重启也不会丢失
+    - 超过 max_age_days 未被使用的罐从文件中清理；本进程正在使用的罐每天刷新一次使用时间，
+      即使服务器长期没有下发新 Cookie 也不会被清理
+    """
+
+    def __init__(self, path: str = COOKIE_FILE, max_age_days: float = 30):
+        self.path = Path(path)
+        self.max_age = float(max_age_days) * 86400
+        self._lock = threading.Lock()
+        self._jars: Dict[str, RequestsCookieJar] = {}
+        self._dirty: Set[str] = set()
+        self._saved = self._read()
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logging.error(f"Cookie 文件读取失败，将使用配置中的 Cookie: {str(e)}")
+            return {}
+
+    def jar(self, key: str, host: str, seed: str = "") -> RequestsCookieJar:
+        """获取（或创建）键对应的 Cookie 罐：先写入配置中的 Cookie，再用保存的 Cookie 覆盖"""
+        with self._lock:
+            jar = self._jars.get(key)
+            if jar is not None:
+                return jar
+            jar = RequestsCookieJar()
+            for name, value in parse_cookie_header(seed):
+                jar.set_cookie(create_cookie(name, value, domain=host, path="/"))
+            now = time.time()
+            for fields in (self._saved.get(key) or {}).get("cookies", []):
+                if fields.get("expires") is not None and fields["expires"] <= now:
+                    continue
+                try:
+                    cookie = create_cookie(**fields)
+                except TypeError:
+                    continue
+                _drop_conflicts(jar, cookie)
+                jar.set_cookie(cookie)
+            self._jars[key] = jar
+            return jar
+
+    def attach(self, session, key: str, host: str, seed: str = "") -> None:
+        """让 session 使用键对应的 Cookie 罐，并在响应带有 Set-Cookie 时记录改动"""
+        jar = self.jar(key, host, seed)
+        session.cookies = jar
+
+        def on_response(response, *args, **kwargs):
+            if not response.cookies:
+                return response
+            # 在 requests 把新 Cookie 写入罐之前，先移除同名但作用域不同的旧值
+            for cookie in response.cookies:
+                _drop_conflicts(jar, cookie)
+            with self._lock:
+                self._dirty.add(key)
+            return response
+
+        session.hooks["response"].append(on_response)
+
+    def flush(self) -> bool:
+        """有改动时写入 Cookie 文件，返回是否成功（没有改动也视为成功）"""
+        now = time.time()
+        with self._lock:
+            for key in self._jars:
+                entry = self._saved.get(key) or {}
+                if now - _last_used(entry) >= _TOUCH_INTERVAL:
+                    self._dirty.add(key)
+            if not self._dirty:
+                return True
+            dirty, self._dirty = self._dirty, set()
+            jars = {key: self._jars[key] for key in dirty if key in self._jars}
+            in_use = set(self._jars)
+
+        saved = self._read()
+        for key, jar in jars.items():
+            saved[key] = {
+                "updated": now,
+                "used": now,
+                "cookies": [
+                    {field: getattr(c, field) for field in _FIELDS}
+                    for c in list(jar)
+                    if c.expires is None or c.expires > now
+                ],
+            }
+        saved = {
+            key: entry
+            for key, entry in saved.items()
+            if isinstance(entry, dict)
+            and (key in in_use or now - _last_used(entry) <= self.max_age)
+        }
+        try:
+            atomic_write_text(self.path, json.dumps(saved, ensure_ascii=False, indent=2))
+        except OSError as e:
+            logging.error(f"Cookie 文件写入失败: {str(e)}")
+            with self._lock:
+                self._dirty |= dirty
+            return False
+        with self._lock:
+            self._saved = saved
+        return True
+
+
+_default_store: Optional[CookieStore] = None
+_default_lock = threading.Lock()
+
+
+def configure_cookie_store(cfg: Optional[dict] = None) -> Optional[CookieStore]:
+    """按 config.json 的 cookies 字段初始化进程内共享的 Cookie 罐，需在创建监控器之前调用
+
+    {
+      "cookies": {
+        "persist": true,
+        "path": "cookies.json",
+        "max_age_days": 30
+      }
+    }
+    persist 为 false 时与原来一样，每个请求都带上配置中的 Cookie 请求头，不保存服务器下发的 Cookie。
+    """
+    global _default_store
+    c = (cfg or {}).get("cookies", {})
+    with _default_lock:
+        if not c.get("persist", True):
+            _default_store = None
+        else:
+            _default_store = CookieStore(
+                c.get("path", COOKIE_FILE), max_age_days=c.get("max_age_days", 30)
+            )
+        return _default_store
+
+
+def get_cookie_store() -> Optional[CookieStore]:
+    """获取进程内共享的 Cookie 罐（未调用 configure_cookie_store 时不启用）"""
+    with _default_lock:
+        return _default_store
+
+
+def flush_cookies() -> bool:
+    store = get_cookie_store()
+    return store.flush() if store is not None else True
@@ -0,0 +1,71 @@
+import logging
+import time
+from urllib.parse import urlencode
+from monitors.base import CompanyMonitor
+from monitors.health import AuthError
+from monitors.registry import register_monitor
+from monitors.spec import compile_spec
+
+
+@register_monitor("generic")
+class GenericMonitor(CompanyMonitor):
+    """按公司条目中的 spec（声明式提取规则，见 monitors/spec.py）查询任意站点"""
+
+    def __init__(self, config):
+        # 规则在创建监控器时编译一次，相同规则的监控器共享编译结果
+        self.spec = compile_spec(config["spec"])
+        self.default_base_url = self.spec.base_url
+        super().__init__(config)
+
+    def login(self):
+        # 基类已应用鉴权，这里通常无需额外处理
+        return True
+
+    def fetch_status(self):
+        try:
+            spec = self.spec
+            api_url = spec.endpoint
+            if not api_url.startswith(("http://", "https://")):
+                api_url = f"{self.base_url}{api_url}"
+            if spec.params:
+                api_url = f"{api_url}?{urlencode(spec.params)}"
+            key_url = api_url
+            if spec.timestamp_param:
+                # 时间戳参数每次都变化，不参与请求合并
+                sep = "&" if spec.params else "?"
+                api_url = f"{api_url}{sep}{spec.timestamp_param}={int(time.time() * 1000)}"
+
+            kwargs = {"headers": self.conditional_headers()}
+            body = self._request_body()
+            if body is not None:
+                kwargs["json"] = body
+            response = self.request_shared(spec.method, api_url, key_url=key_url, **kwargs)
+
+            return self.parse_cached(response, self._parse_status)
+
+        except AuthError:
+            raise
+        except Exception as e:
+            logging.error(f"状态解析失败: {str(e)}")
+            return None
+
+    def _request_body(self):
+        body_override = self.extra.get("request_body")
+        if self.spec.body is None and body_override is None:
+            return None
+        return {**(self.spec.body or {}), **(body_override or {})}
+
+    def _parse_status(self, response):
+        data = self.decode_shared(response, lambda r: r.json())
+        valid_records = self.spec.records(data)
+
+        if valid_records is None:
+            message = self.spec.message(data) if isinstance(data, dict) else None
+            code = self.spec.code(data) if isinstance(data, dict) else None
+            self.check_auth(code, message)
+            logging.error(f"接口响应异常: {message}")
+            return None
+
+        return self.select_status(
+            valid_records, self.spec.id_field, self.spec.summarize, self.spec.format_status
+        )
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# 默认每 6 小时用失效的凭据试探一次
+DEFAULT_PROBE_INTERVAL = 6 * 3600
+
+# 接口返回的业务码为这些值时视为登录态失效（各 provider 可通过 auth_codes 补充）
+AUTH_CODES = (401, 403)
+
+
+class AuthError(Exception):
+    """登录凭据（Cookie/Authorization）失效"""
+
+
+def looks_like_auth_failure(code=None, auth_codes: Iterable = ()) -> bool:
+    """根据接口返回的业务码判断是否为鉴权失败
+
+    只认明确的业务码（401/403 及 provider 声明的 auth_codes），不按提示文字猜测，
+    避免普通业务错误的提示中碰巧出现“登录”“过期”等字样时误判并暂停轮询。
+    """
+    if code is None:
+        return False
+    return str(code) in {str(c) for c in (*AUTH_CODES, *auth_codes)}
+
+
+_notified: Dict[str, float] = {}
+_notified_lock = threading.Lock()
+
+
+def claim_auth_notice(account: str) -> bool:
+    """同一账号的多个监控器只发送一次失效通知：返回调用方是否应当发送"""
+    with _notified_lock:
+        if account in _notified:
+            return False
+        _notified[account] = time.time()
+        return True
+
+
+def clear_auth_notice(account: str) -> None:
+    """账号恢复后调用，下次失效时重新通知"""
+    with _notified_lock:
+        _notified.pop(account, None)
+
+
+class CredentialBreaker:
+    """凭据熔断器
+
+    - closed：正常轮询
+    - open：凭据已失效，停止轮询，每 probe_interval 秒放行一次试探请求
+    试探成功后回到 closed。
+    """
+
+    def __init__(self, probe_interval: float = DEFAULT_PROBE_INTERVAL):
+        self.probe_interval = float(probe_interval)
+        self.opened_at: Optional[float] = None
+        self._last_probe = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """本次是否允许发出请求"""
+        if self.opened_at is None:
+            return True
+        now = time.time()
+        if now - max(self.opened_at, self._last_probe) >= self.probe_interval:
+            self._last_probe = now
+            return True
+        return False
+
+    def restore(self, opened_at: float) -> None:
+        """恢复重启前的熔断状态：视为 opened_at 时打开，下一次试探在其后 probe_interval 秒"""
+        self.opened_at = opened_at
+        self._last_probe = opened_at
+
+    def record_success(self) -> bool:
+        """记录一次成功请求，返回熔断器是否因此恢复"""
+        recovered = self.opened_at is not None
+        self.opened_at = None
+        return recovered
+
+    def record_auth_failure(self) -> bool:
+        """记录一次鉴权失败，返回熔断器是否因此打开（首次失效）"""
+        if self.opened_at is not None:
+            return False
+        self.opened_at = time.time()
+        self._last_probe = self.opened_at
+        return True
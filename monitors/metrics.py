@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from monitors.state import atomic_write_text
+
+# 耗时直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 各指标的说明，输出为 Prometheus 的 HELP 行
+_HELP = {
+    "offerchecker_phase_seconds": "各阶段耗时：fetch/decode/extract/state_io/email",
+    "offerchecker_round_seconds": "一轮检查的总耗时",
+    "offerchecker_checks_total": "检查次数，按结果（changed/unchanged/error/auth_failed/timeout 等）区分",
+    "offerchecker_notifications_total": "通知投递次数，按渠道与结果（sent/failed/dropped）区分",
+    "offerchecker_notification_seconds": "各通知渠道单次投递耗时",
+    "offerchecker_notification_queue": "待发送的通知数量",
+    "offerchecker_cache_hits_total": "响应指纹缓存命中次数",
+    "offerchecker_cache_misses_total": "响应指纹缓存未命中次数",
+}
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> _Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """进程内指标：计数器、瞬时值与耗时直方图，可输出为 Prometheus 文本格式
+
+    记录只是在锁内更新几个数字，可放在每次请求、解析的路径上。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[_Labels, float]] = {}
+        self._gauges: Dict[str, Dict[_Labels, float]] = {}
+        self._histograms: Dict[str, Dict[_Labels, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist.counts[i] += 1
+                    break
+            hist.total += seconds
+            hist.count += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """计时上下文，异常时同样记录耗时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def phase(self, phase: str, provider: Optional[str] = None):
+        """offerchecker_phase_seconds 的计时上下文"""
+        return self.timer("offerchecker_phase_seconds", phase=phase, provider=provider)
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        lines = []
+
+        def header(name, kind):
+            if name in _HELP:
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name in sorted(self._counters):
+                header(name, "counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name in sorted(self._gauges):
+                header(name, "gauge")
+                for labels, value in sorted(self._gauges[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name in sorted(self._histograms):
+                header(name, "histogram")
+                for labels, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, hist.counts):
+                        cumulative += count
+                        le = _format_labels(labels, ("le", f"{bound:g}"))
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    le = _format_labels(labels, ("le", "+Inf"))
+                    lines.append(f"{name}_bucket{le} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {hist.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """原子地写入文件（可配合 node_exporter 的 textfile collector）"""
+        atomic_write_text(Path(path), self.render())
+
+
+class MetricsServer:
+    """在后台线程中提供 GET /metrics 的轻量 HTTP 服务"""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9108):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                data = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, fmt, *args):
+                logging.debug("metrics: " + fmt % args)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2]
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+_default_metrics: Optional[Metrics] = None
+_default_server: Optional[MetricsServer] = None
+_metrics_file: Optional[str] = None
+_default_lock = threading.Lock()
+
+
+def configure_metrics(cfg: Optional[dict] = None) -> Metrics:
+    """按 config.json 的 metrics 字段初始化指标输出
+
+    {
+      "metrics": {
+        "listen": "127.0.0.1",
+        "port": 9108,
+        "file": "metrics.prom"
+      }
+    }
+    配置 port 时启动 HTTP 服务（GET /metrics），配置 file 时每轮结束后写入文件；
+    都不配置时指标仍会记录，只是不对外输出。
+    """
+    global _default_server, _metrics_file
+    m = (cfg or {}).get("metrics", {})
+    metrics = get_metrics()
+    with _default_lock:
+        _metrics_file = m.get("file")
+        if m.get("port") and _default_server is None:
+            try:
+                _default_server = MetricsServer(
+                    metrics, m.get("listen", "127.0.0.1"), int(m["port"])
+                )
+                host, port = _default_server.address
+                logging.info(f"指标服务已启动: http://{host}:{port}/metrics")
+            except OSError as e:
+                logging.error(f"指标服务启动失败: {str(e)}")
+    return metrics
+
+
+def dump_metrics() -> None:
+    """配置了 metrics.file 时写出当前指标（每轮结束后调用）"""
+    if not _metrics_file:
+        return
+    try:
+        get_metrics().dump(_metrics_file)
+    except OSError as e:
+        logging.error(f"写入指标文件失败: {str(e)}")
+
+
+def get_metrics() -> Metrics:
+    """获取进程内共享的指标"""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
@@ -1,51 +1,111 @@
 import logging
 from monitors.base import CompanyMonitor
+from monitors.health import AuthError
 from monitors.registry import register_monitor
+from monitors.transport import get_transport
 
 
 @register_monitor("mihoyo")
 class MiHoYoMonitor(CompanyMonitor):
+    default_base_url = "https://ats.openout.mihoyo.com"
+    # 接口 code 字段表示未登录/登录已过期的取值（401/403 之外）
+    auth_codes = (-100,)
+
+    def __init__(self, config):
+        super().__init__(config)
+        # 上一轮找到目标岗位的页码，下一轮从这一页开始找
+        self._target_page = 1
+        # 最多翻几页，避免投递历史很长时每轮请求量失控
+        self.max_pages = int(self.extra.get("max_pages", 20))
+        # 投递列表接口用 POST 查询，没有副作用，失败时可以重试
+        get_transport().read_only(self.session, self._list_url())
+
     def login(self):
         # 基类已应用鉴权，这里通常无需额外处理
         return True
 
     def fetch_status(self):
         try:
-            api_url = "https://ats.openout.mihoyo.com/ats-portal/v1/apply_job/list"
-            default_body = {"pageNo": 1, "pageSize": 10}
-            body_override = self.extra.get("request_body", {})
-            request_body = {**default_body, **body_override}
+            if self.track_all:
+                records = []
+                for _page_no, page in self._iter_pages():
+                    records.extend(page)
+                return self.select_status(
+                    records, "id", self._summarize, self._format_status
+                )
 
-            response = self.session.post(api_url, json=request_body, headers=self.headers)
-            response.raise_for_status()
+            if not self.position_id:
+                return self.select_status(
+                    self._fetch_page(1), "id", self._summarize, self._format_status
+                )
 
-            data = response.json()
+            for page_no, page in self._iter_pages(self._target_page):
+                if any(item["id"] == self.position_id for item in page):
+                    self._target_page = page_no
+                    return self.select_status(
+                        page, "id", self._summarize, self._format_status
+                    )
 
-            if data["code"] != 0 or not data.get("data"):
-                logging.error(f"接口响应异常: {data.get('message')}")
-                return None
+            logging.warning(f"未找到ID为{getattr(self, 'target_position_id', self.position_id)}的岗位")
+            return None
 
-            valid_records = [item for item in data["data"]["list"]]
+        except AuthError:
+            raise
+        except Exception as e:
+            logging.error(f"状态解析失败: {str(e)}")
+            return None
 
-            if not valid_records:
-                logging.warning("没有有效的投递记录")
-                return "无有效投递"
+    def _request_body(self, page_no):
+        default_body = {"pageNo": 1, "pageSize": 10}
+        body_override = self.extra.get("request_body", {})
+        return {**default_body, **body_override, "pageNo": page_no}
 
-            if self.position_id:
-                target_record = next(
-                    (item for item in valid_records if item["id"] == self.position_id),
-                    None,
-                )
-                if not target_record:
-                    logging.warning(f"未找到ID为{getattr(self, 'target_position_id', self.position_id)}的岗位")
-                    return None
-            else:
-                target_record = valid_records[0]
+    def _list_url(self):
+        return f"{self.base_url}/ats-portal/v1/apply_job/list"
 
-            status_info = f"{target_record['jobTitle']} - {target_record['status']} "
+    def _fetch_page(self, page_no):
+        response = self.request_shared(
+            "POST",
+            self._list_url(),
+            json=self._request_body(page_no),
+            headers=self.conditional_headers(slot=page_no),
+        )
+        return self.parse_cached(response, self._parse_page, slot=page_no)
 
-            return status_info
+    def _iter_pages(self, start_page=1):
+        """逐页按需请求，yield (页码, 记录列表)
 
-        except Exception as e:
-            logging.error(f"状态解析失败: {str(e)}")
-            return None
+        先请求 start_page，之后从第 1 页向后翻（跳过已请求的页），
+        遇到不满一页或达到 max_pages 时结束；调用方找到目标后即可停止迭代。
+        """
+        page_size = self._request_body(1)["pageSize"]
+        first = None
+        if 1 < start_page <= self.max_pages:
+            first = self._fetch_page(start_page)
+            yield start_page, first
+        for page_no in range(1, self.max_pages + 1):
+            if first is not None and page_no == start_page:
+                if len(first) < page_size:
+                    return
+                continue
+            page = self._fetch_page(page_no)
+            yield page_no, page
+            if len(page) < page_size:
+                return
+
+    def _parse_page(self, response):
+        data = self.decode_shared(response, lambda r: r.json())
+
+        if data["code"] != 0 or not data.get("data"):
+            self.check_auth(data.get("code"), data.get("message"))
+            raise ValueError(f"接口响应异常: {data.get('message')}")
+
+        return [item for item in data["data"]["list"]]
+
+    @staticmethod
+    def _summarize(record):
+        return {"title": record["jobTitle"], "stage": record["status"]}
+
+    @staticmethod
+    def _format_status(record):
+        return f"{record['jobTitle']} - {record['status']} "
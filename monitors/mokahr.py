@@ -3,7 +3,9 @@ import base64
 import logging
 from Crypto.Cipher import AES as _AES
 from monitors.base import CompanyMonitor
+from monitors.health import AuthError
 from monitors.registry import register_monitor
+from monitors.transport import get_transport
 
 
 def _aes_decrypt(content: str, key=None, IV=None):
@@ -12,77 +14,93 @@ def _aes_decrypt(content: str, key=None, IV=None):
     return (cipher.decrypt(content).decode("utf-8")).replace("\n", "")
 
 
+def _decode_response(response):
+    data = response.json()
+
+    base64Data = data["data"]
+    necromancer = data["necromancer"]
+
+    AES_KEY = necromancer.encode("utf-8")
+    AES_IV = "de7c21ed8d6f50fe".encode("utf-8")
+
+    dec_data = _aes_decrypt(base64Data, AES_KEY, AES_IV)
+
+    return json.loads(dec_data)
+
+
 @register_monitor("mokahr")
 class MokaHRMonitor(CompanyMonitor):
+    default_base_url = "https://app.mokahr.com"
+    # 接口 code 字段表示未登录/登录已过期的取值（401/403 之外）
+    auth_codes = (10001,)
+
+    def __init__(self, config):
+        super().__init__(config)
+        # 投递列表接口用 POST 查询，没有副作用，失败时可以重试
+        get_transport().read_only(self.session, self._list_url())
+
     def login(self):
         # 基类已应用鉴权，这里通常无需额外处理
         return True
 
     def fetch_status(self):
         try:
-            api_url = "https://app.mokahr.com/api/outer/ats-apply/personal-center/applications"
-            default_body = {}
-            body_override = self.extra.get("request_body", {})
-            request_body = {**default_body, **body_override}
-            response = self.session.post(api_url, json=request_body, headers=self.headers)
-            response.raise_for_status()
+            request_body = self._request_body()
+            response = self.request_shared(
+                "POST", self._list_url(), json=request_body, headers=self.conditional_headers()
+            )
 
-            data = response.json()
+            return self.parse_cached(response, self._parse_status)
 
-            base64Data = data["data"]
-            necromancer = data["necromancer"]
+        except AuthError:
+            raise
+        except Exception as e:
+            logging.error(f"状态解析失败: {str(e)}")
+            return None
 
-            AES_KEY = necromancer.encode("utf-8")
-            AES_IV = "de7c21ed8d6f50fe".encode("utf-8")
+    def _list_url(self):
+        return f"{self.base_url}/api/outer/ats-apply/personal-center/applications"
 
-            dec_data = _aes_decrypt(base64Data, AES_KEY, AES_IV)
+    def _request_body(self):
+        default_body = {}
+        body_override = self.extra.get("request_body", {})
+        return {**default_body, **body_override}
 
-            data_json = json.loads(dec_data)
+    def _parse_status(self, response):
+        data_json = self.decode_shared(response, _decode_response)
 
-            if data_json["code"] != 0 or not data_json.get("data"):
-                logging.error(f"接口响应异常: {data_json.get('message')}")
-                return None
+        if data_json["code"] != 0 or not data_json.get("data"):
+            self.check_auth(data_json.get("code"), data_json.get("message"))
+            logging.error(f"接口响应异常: {data_json.get('message')}")
+            return None
 
-            campusApplyList = [
-                item
-                for item in data_json["data"]["campusApplyList"]
-                if item["id"] == request_body.get("orgId")
-            ]
+        campusApplyList = [
+            item
+            for item in data_json["data"]["campusApplyList"]
+            if item["id"] == self._request_body().get("orgId")
+        ]
 
-            if not campusApplyList:
-                logging.warning("没有有效的投递记录")
-                return "无有效投递"
+        if not campusApplyList:
+            return self.empty_status()
 
-            valid_records = [
-                item
-                for item in campusApplyList[0]["candidateApps"][0]["projectApps"][0][
-                    "apps"
-                ]
+        valid_records = [
+            item
+            for item in campusApplyList[0]["candidateApps"][0]["projectApps"][0][
+                "apps"
             ]
-
-            if not valid_records:
-                logging.warning("没有有效的投递记录")
-                return "无有效投递"
-
-            if self.position_id:
-                target_record = next(
-                    (
-                        item
-                        for item in valid_records
-                        if item["appId"] == self.position_id
-                    ),
-                    None,
-                )
-                if not target_record:
-                    logging.warning(f"未找到ID为{getattr(self, 'target_position_id', self.position_id)}的岗位")
-                    return None
-            else:
-                target_record = valid_records[0]
-
-            status_info = f"{target_record['orgName']} - {target_record['jobTitle']} - {target_record['stage']}"
-
-            return status_info
-
-        except Exception as e:
-            logging.error(f"状态解析失败: {str(e)}")
-            return None
+        ]
+
+        return self.select_status(
+            valid_records, "appId", self._summarize, self._format_status
+        )
+
+    @staticmethod
+    def _summarize(record):
+        return {
+            "title": f"{record['orgName']} - {record['jobTitle']}",
+            "stage": record["stage"],
+        }
+
+    @staticmethod
+    def _format_status(record):
+        return f"{record['orgName']} - {record['jobTitle']} - {record['stage']}"
@@ -1,13 +1,29 @@
 import logging
 from monitors.base import CompanyMonitor
+from monitors.health import AuthError
 from monitors.registry import register_monitor
-
-
-@register_monitor("netease_huyu")
-class NeteaseHuyuMonitor(CompanyMonitor):
-    def __init__(self, config):
-        super().__init__(config)
-        self.h_map = {
+from monitors.spec import compile_status
+
+# 节点状态解码表，按 keys 的顺序查表，第一个命中的即为状态：
+# 1. "节点前缀:节点状态"：失败/放弃/拒绝等终止类状态（节点状态可能为 2/3 等）
+# 2. 完整节点编号：具体的面试轮次
+# 3. 节点前缀：阶段性状态
+_NODE_STATUS = compile_status(
+    {
+        "keys": [
+            "{curProcessNode:.3}:{curProcessNodeStatus}",
+            "{curProcessNode}",
+            "{curProcessNode:.3}",
+        ],
+        "table": {
+            "S00:2": "筛选未通过",
+            "E00:2": "笔试未通过",
+            "E00:3": "已放弃笔试",
+            "I00:2": "面试不通过",
+            "I00:3": "已放弃面试",
+            "T00:2": "录用不通过",
+            "T00:3": "候选人已拒绝",
+            "O00:3": "候选人已拒绝",
             "I0010001": "hr一面",
             "I0010002": "hr二面",
             "I0010003": "hr三面",
@@ -17,7 +33,22 @@ class NeteaseHuyuMonitor(CompanyMonitor):
             "I0030001": "追加一面",
             "I0030002": "追加二面",
             "I0030003": "追加三面",
-        }
+            "S00": "筛选",
+            "E00": "笔试",
+            "I00": "面试",
+            "T00": "录用审核",
+            "O00": "入职",
+        },
+        "default": "未知",
+    }
+)
+
+
+@register_monitor("netease_huyu")
+class NeteaseHuyuMonitor(CompanyMonitor):
+    default_base_url = "https://game.campus.163.com"
+    # 接口 status 字段表示未登录/登录已过期的取值（401/403 之外）
+    auth_codes = (-1,)
 
     def login(self):
         # 基类已应用鉴权，这里通常无需额外处理
@@ -25,83 +56,47 @@ class NeteaseHuyuMonitor(CompanyMonitor):
 
     def fetch_status(self):
         try:
-            api_url = "https://game.campus.163.com/api/recruitment/campus/deliveryRecord/currentDeliveryRecord"
-
-            response = self.session.get(api_url, headers=self.headers)
-            response.raise_for_status()
-
-            data = response.json()
+            api_url = f"{self.base_url}/api/recruitment/campus/deliveryRecord/currentDeliveryRecord"
 
-            if data["status"] != 1 or not data.get("data"):
-                logging.error(f"接口响应异常: {data.get('message')}")
-                return None
+            response = self.request_shared(
+                "GET", api_url, headers=self.conditional_headers()
+            )
 
-            valid_records = [item for item in data["data"]]
+            return self.parse_cached(response, self._parse_status)
 
-            if not valid_records:
-                logging.warning("没有有效的投递记录")
-                return "无有效投递"
+        except AuthError:
+            raise
+        except Exception as e:
+            logging.error(f"状态解析失败: {str(e)}")
+            return None
 
-            if self.position_id:
-                target_record = next(
-                    (item for item in valid_records if item["id"] == self.position_id),
-                    None,
-                )
-                if not target_record:
-                    logging.warning(f"未找到ID为{getattr(self, 'target_position_id', self.position_id)}的岗位")
-                    return None
-            else:
-                target_record = valid_records[0]
+    def _parse_status(self, response):
+        data = self.decode_shared(response, lambda r: r.json())
 
-            # 基于节点与节点状态的判定（参考站点 JS 逻辑）
-            node = target_record.get("curProcessNode", "")
-            node_status = target_record.get("curProcessNodeStatus")  # 可能为 2/3 等
+        if data["status"] != 1 or not data.get("data"):
+            self.check_auth(data.get("status"), data.get("message"))
+            logging.error(f"接口响应异常: {data.get('message')}")
+            return None
 
-            status = "未知"
+        valid_records = [item for item in data["data"]]
 
-            # 优先处理失败/放弃/拒绝等终止类状态
-            if node and node_status is not None:
-                if node.startswith("S00") and node_status == 2:
-                    status = "筛选未通过"
-                elif node.startswith("E00"):
-                    if node_status == 2:
-                        status = "笔试未通过"
-                    elif node_status == 3:
-                        status = "已放弃笔试"
-                elif node.startswith("I00"):
-                    if node_status == 2:
-                        status = "面试不通过"
-                    elif node_status == 3:
-                        status = "已放弃面试"
-                elif node.startswith("T00"):
-                    if node_status == 2:
-                        status = "录用不通过"
-                    elif node_status == 3:
-                        status = "候选人已拒绝"
-                elif node.startswith("O00") and node_status == 3:
-                    status = "候选人已拒绝"
+        return self.select_status(
+            valid_records, "id", self._summarize, self._format_status
+        )
 
-            # 若未命中终止类状态，则给出阶段性状态描述
-            if status == "未知":
-                if node.startswith("S00"):
-                    status = "筛选"
-                elif node.startswith("E00"):
-                    status = "笔试"
-                elif node.startswith("I00"):
-                    status = self.h_map.get(node) or "面试"
-                elif node.startswith("T00"):
-                    status = "录用审核"
-                elif node.startswith("O00"):
-                    status = "入职"
+    def _node_status(self, record):
+        """基于节点与节点状态的判定（参考站点 JS 逻辑），见 _NODE_STATUS"""
+        return _NODE_STATUS(record)
 
-            status_info = (
-                f"{target_record['positionName']} - "
-                f"{status} "
-                f"({target_record['projectName']})"
-            )
-
-            return status_info
+    def _summarize(self, record):
+        return {
+            "title": f"{record['positionName']} ({record['projectName']})",
+            "stage": self._node_status(record),
+        }
 
-        except Exception as e:
-            logging.error(f"状态解析失败: {str(e)}")
-            return None
+    def _format_status(self, record):
+        return (
+            f"{record['positionName']} - "
+            f"{self._node_status(record)} "
+            f"({record['projectName']})"
+        )
@@ -1,55 +1,64 @@
 import time
 import logging
 from monitors.base import CompanyMonitor
+from monitors.health import AuthError
 from monitors.registry import register_monitor
 
 
 @register_monitor("netease_leihuo")
 class NeteaseLeihuoMonitor(CompanyMonitor):
+    default_base_url = "https://campus.163.com"
+    # 接口 code 字段表示未登录/登录已过期的取值（401/403 之外）
+    auth_codes = (1001,)
+
     def login(self):
         # 基类已应用鉴权，这里通常无需额外处理
         return True
 
     def fetch_status(self):
         try:
+            base_url = f"{self.base_url}/api/campuspc/apply/find"
             timestamp = int(time.time() * 1000)
-            api_url = f"https://campus.163.com/api/campuspc/apply/find?timeStamp={timestamp}"
-            response = self.session.get(api_url, headers=self.headers)
-            response.raise_for_status()
-
-            data = response.json()
-
-            if data["code"] != 200 or not data.get("data"):
-                logging.error(f"接口响应异常: {data.get('msg')}")
-                return None
-
-            valid_records = [
-                item for item in data["data"]["leihuoList"] if item["invalidFlag"] == 0
-            ]
-
-            if not valid_records:
-                logging.warning("没有有效的投递记录")
-                return "无有效投递"
-
-            if self.position_id:
-                target_record = next(
-                    (item for item in valid_records if item["id"] == self.position_id),
-                    None,
-                )
-                if not target_record:
-                    logging.warning(f"未找到ID为{getattr(self, 'target_position_id', self.position_id)}的岗位")
-                    return None
-            else:
-                target_record = valid_records[0]
-
-            status_info = (
-                f"{target_record['applyPosition']} - "
-                f"{target_record['applyStatusValue']} "
-                f"({target_record['projectName']})"
+            api_url = f"{base_url}?timeStamp={timestamp}"
+            response = self.request_shared(
+                "GET", api_url, key_url=base_url, headers=self.conditional_headers()
             )
 
-            return status_info
+            return self.parse_cached(response, self._parse_status)
 
+        except AuthError:
+            raise
         except Exception as e:
             logging.error(f"状态解析失败: {str(e)}")
             return None
+
+    def _parse_status(self, response):
+        data = self.decode_shared(response, lambda r: r.json())
+
+        if data["code"] != 200 or not data.get("data"):
+            self.check_auth(data.get("code"), data.get("msg"))
+            logging.error(f"接口响应异常: {data.get('msg')}")
+            return None
+
+        valid_records = [
+            item for item in data["data"]["leihuoList"] if item["invalidFlag"] == 0
+        ]
+
+        return self.select_status(
+            valid_records, "id", self._summarize, self._format_status
+        )
+
+    @staticmethod
+    def _summarize(record):
+        return {
+            "title": f"{record['applyPosition']} ({record['projectName']})",
+            "stage": record["applyStatusValue"],
+        }
+
+    @staticmethod
+    def _format_status(record):
+        return (
+            f"{record['applyPosition']} - "
+            f"{record['applyStatusValue']} "
+            f"({record['projectName']})"
+        )
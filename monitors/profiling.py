@@ -0,0 +1,367 @@
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from monitors.state import atomic_write_text, tagged_path
+
+# 线程停在这些文件中时视为在等待（网络 I/O、锁、队列），不计入热点函数
+_WAITING_FILES = {"threading.py", "selectors.py", "socket.py", "ssl.py", "queue.py"}
+
+# 主线程在一轮检查期间的标签（调度、落盘、通知入队等）
+ROUND_LABEL = "(round)"
+
+_Func = Tuple[str, int, str]
+
+
+def _where(filename: str, lineno: int) -> str:
+    """把文件路径缩短为相对于项目或 site-packages 的形式"""
+    for base in (os.getcwd(), *sys.path):
+        if base and filename.startswith(base + os.sep):
+            filename = filename[len(base) + 1 :]
+            break
+    return f"{filename}:{lineno}"
+
+
+def _raw_traces(snapshot: "tracemalloc.Snapshot") -> list:
+    """返回 [(domain, 字节数, ((文件, 行号), ...)), ...]，最近的帧在前
+
+    直接使用快照内部的元组，不为每条记录、每一帧创建对象：分析时 tracemalloc 仍在记录，
+    每次分配都要保存调用栈，逐帧创建对象会让报告生成慢上一个数量级。内部结构不可用时退回公开接口。
+    """
+    raw = getattr(snapshot.traces, "_traces", None)
+    if raw is not None:
+        return raw
+    return [
+        (0, t.size, tuple((f.filename, f.lineno) for f in reversed(t.traceback)))
+        for t in snapshot.traces
+    ]
+
+
+class Profiler:
+    """采样式 CPU 剖析 + tracemalloc 内存快照，定期把报告写入目录
+
+    - CPU：后台线程每 sample_interval 秒读取一次正在执行 fetch_status 的线程（按 provider 区分）
+      与一轮检查期间主线程的调用栈，统计各函数作为栈顶（自身）与出现在栈中（累计）的次数；
+      栈顶位于网络 I/O、锁等待中的样本单独计为等待，不计入热点
+    - 内存：每次写报告时拍摄快照，输出各 provider 调用路径上仍存活的分配位置，
+      以及与上一份报告相比增长最多的位置
+    - 每 every 轮写一份报告，目录中最多保留 keep 份（只计本进程 tag 的报告：
+      分片或多副本共用同一目录时，各进程只清理自己的报告）
+
+    采样不依赖被测代码的插桩，开销主要来自 tracemalloc（memory 为 false 时可关闭）。
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        sample_interval: float = 0.01,
+        every: int = 1,
+        top: int = 15,
+        keep: int = 48,
+        memory: bool = True,
+        frames: int = 25,
+        tag: str = "",
+    ):
+        self.out_dir = Path(out_dir)
+        # 报告文件名前缀：profile 或 profile.<tag>
+        self._prefix = Path(tagged_path("profile", tag)).name if tag else "profile"
+        self.sample_interval = max(float(sample_interval), 0.001)
+        self.every = max(int(every), 1)
+        self.top = int(top)
+        self.keep = int(keep)
+        self.memory = bool(memory)
+        self.frames = int(frames)
+        self._lock = threading.Lock()
+        self._active: Dict[int, str] = {}
+        self._modules: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 上一份报告的内存快照
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._samples: Counter = Counter()
+        self._waiting: Counter = Counter()
+        self._self: Dict[str, Counter] = defaultdict(Counter)
+        self._cumulative: Dict[str, Counter] = defaultdict(Counter)
+        self._calls: Counter = Counter()
+        self._elapsed: Counter = Counter()
+        self._rounds: List[float] = []
+        self._window_started = time.time()
+
+    def start(self) -> "Profiler":
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        logging.info(f"性能剖析已开启，报告目录: {self.out_dir}")
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def track(self, label: str, module: Optional[str] = None) -> Iterator[None]:
+        """把当前线程在 with 块中的样本记到 label 名下（一般为 provider），并统计调用次数与耗时"""
+        ident = threading.get_ident()
+        with self._lock:
+            previous = self._active.get(ident)
+            self._active[ident] = label
+            if module and label not in self._modules:
+                path = getattr(sys.modules.get(module), "__file__", None)
+                if path:
+                    self._modules[label] = path
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                if previous is None:
+                    self._active.pop(ident, None)
+                else:
+                    self._active[ident] = previous
+                self._calls[label] += 1
+                self._elapsed[label] += elapsed
+
+    @contextmanager
+    def round(self) -> Iterator[None]:
+        """包住一轮检查；每 every 轮写出一份报告"""
+        started = time.perf_counter()
+        with self.track(ROUND_LABEL):
+            yield
+        with self._lock:
+            self._rounds.append(time.perf_counter() - started)
+            due = len(self._rounds) >= self.every
+        if due:
+            self.write_report()
+
+    # --- 采样 ---
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, label in active.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != me:
+                        self._record(label, frame)
+
+    def _record(self, label: str, frame) -> None:
+        code = frame.f_code
+        if os.path.basename(code.co_filename) in _WAITING_FILES:
+            self._waiting[label] += 1
+            return
+        self._samples[label] += 1
+        self._self[label][(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            func = (code.co_filename, code.co_firstlineno, code.co_name)
+            if func not in seen:
+                seen.add(func)
+                self._cumulative[label][func] += 1
+            frame = frame.f_back
+
+    # --- 报告 ---
+    def write_report(self) -> Optional[Path]:
+        with self._lock:
+            text = self.report()
+            self._reset()
+        now = datetime.datetime.now()
+        path = self.out_dir / f"{self._prefix}-{now:%Y%m%d-%H%M%S}-{os.getpid()}.txt"
+        try:
+            atomic_write_text(path, text)
+        except OSError as e:
+            logging.error(f"写入性能剖析报告失败: {str(e)}")
+            return None
+        self._prune()
+        logging.info(f"性能剖析报告已写入: {path}")
+        return path
+
+    def _prune(self) -> None:
+        reports = sorted(
+            self.out_dir.glob(f"{self._prefix}-*.txt"), key=lambda p: p.stat().st_mtime
+        )
+        for old in reports[: max(len(reports) - self.keep, 0)]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def report(self) -> str:
+        """生成当前窗口的文字报告（调用方持有锁）"""
+        window = time.time() - self._window_started
+        lines = [
+            f"# 性能剖析报告 {datetime.datetime.now():%Y-%m-%d %H:%M:%S}（pid {os.getpid()}）",
+            f"统计窗口 {window:.0f} 秒，{len(self._rounds)} 轮，采样间隔 {self.sample_interval * 1000:g}ms",
+        ]
+        if self._rounds:
+            lines.append(
+                f"每轮耗时：平均 {sum(self._rounds) / len(self._rounds):.3f}s，"
+                f"最长 {max(self._rounds):.3f}s"
+            )
+
+        labels = sorted(
+            set(self._samples) | set(self._waiting) | set(self._calls),
+            key=lambda label: (label == ROUND_LABEL, label),
+        )
+        for label in labels:
+            busy, waiting = self._samples[label], self._waiting[label]
+            total = busy + waiting
+            lines.append("")
+            lines.append(f"## {label}")
+            if self._calls[label] and label != ROUND_LABEL:
+                lines.append(
+                    f"fetch_status 调用 {self._calls[label]} 次，"
+                    f"平均 {self._elapsed[label] / self._calls[label]:.3f}s"
+                )
+            if total:
+                lines.append(
+                    f"样本 {total} 个：执行 {busy}（{busy / total:.0%}），等待 I/O 或锁 {waiting}"
+                )
+            if busy:
+                lines.append("自身耗时最多的函数（样本数 / 占执行样本比例）：")
+                lines.extend(self._format_funcs(self._self[label], busy))
+                lines.append("累计耗时最多的函数（含其调用的函数）：")
+                lines.extend(self._format_funcs(self._cumulative[label], busy))
+
+        if self.memory and tracemalloc.is_tracing():
+            lines.extend(self._memory_report())
+        return "\n".join(lines) + "\n"
+
+    def _format_funcs(self, counter: Counter, busy: int) -> List[str]:
+        return [
+            f"  {count:6d}  {count / busy:6.1%}  {name}  ({_where(filename, lineno)})"
+            for (filename, lineno, name), count in counter.most_common(self.top)
+        ]
+
+    def _memory_report(self) -> List[str]:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = ["", "## 内存", f"当前 {current / 1024:.0f} KiB，峰值 {peak / 1024:.0f} KiB"]
+        # tracemalloc 自带的 Filter 对每个帧做 fnmatch，快照较大时要几十秒，这里都用精确匹配
+        ignore = {tracemalloc.__file__, __file__}
+
+        if self._previous is not None:
+            diffs = [
+                s
+                for s in snapshot.compare_to(self._previous, "lineno")
+                if s.traceback[0].filename not in ignore
+            ]
+            total = sum(s.size_diff for s in diffs)
+            lines.append(f"与上一份报告相比增长 {total / 1024:+.0f} KiB，增长最多的位置：")
+            for stat in [s for s in diffs if s.size_diff > 0][: self.top]:
+                frame = stat.traceback[0]
+                lines.append(
+                    f"  {stat.size_diff / 1024:+9.1f} KiB  {stat.count_diff:+7d} 块  "
+                    f"{_where(frame.filename, frame.lineno)}"
+                )
+        self._previous = snapshot
+
+        # 调用栈经过 provider 模块的存活分配，按分配位置（最近的一帧）汇总；
+        # 循环内尽量不创建新对象，原因见 _raw_traces
+        label_of = {path: label for label, path in self._modules.items()}
+        sizes: Dict[str, Counter] = defaultdict(Counter)
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        for trace in _raw_traces(snapshot):
+            frames = trace[2]
+            for frame in frames:
+                label = label_of.get(frame[0])
+                if label is not None:
+                    sizes[label][frames[0]] += trace[1]
+                    counts[label][frames[0]] += 1
+                    break
+
+        for label in sorted(sizes):
+            lines.append("")
+            lines.append(
+                f"### {label}：调用路径上仍存活的分配 {sum(sizes[label].values()) / 1024:.0f} KiB"
+            )
+            for (filename, lineno), size in sizes[label].most_common(self.top):
+                lines.append(
+                    f"  {size / 1024:9.1f} KiB  {counts[label][(filename, lineno)]:7d} 块  "
+                    f"{_where(filename, lineno)}"
+                )
+        return lines
+
+
+class _NullProfiler:
+    """未开启剖析时使用，track/round 不做任何事"""
+
+    def track(self, label: str, module: Optional[str] = None):
+        return nullcontext()
+
+    def round(self):
+        return nullcontext()
+
+    def close(self) -> None:
+        pass
+
+
+_NULL = _NullProfiler()
+_default_profiler = None
+_default_lock = threading.Lock()
+
+
+def configure_profiling(
+    cfg: Optional[dict] = None, out_dir: str = "profiles", force: bool = False, tag: str = ""
+):
+    """按 config.json 的 profiling 字段开启性能剖析（force 为 True 时等同 enabled，对应 --profile）
+
+    {
+      "profiling": {
+        "enabled": false,
+        "dir": "profiles",
+        "sample_interval": 0.01,
+        "every": 1,
+        "top": 15,
+        "keep": 48,
+        "memory": true,
+        "frames": 25
+      }
+    }
+    dir 缺省为 out_dir（main.py 传入配置文件所在目录下的 profiles）。
+    tag 区分共用同一目录的进程（分片的工作进程、多个副本），报告为 profile.<tag>-<时间>-<进程号>.txt。
+    """
+    global _default_profiler
+    p = (cfg or {}).get("profiling", {})
+    with _default_lock:
+        if _default_profiler is not None:
+            _default_profiler.close()
+            _default_profiler = None
+        if force or p.get("enabled"):
+            _default_profiler = Profiler(
+                p.get("dir", out_dir),
+                sample_interval=p.get("sample_interval", 0.01),
+                every=p.get("every", 1),
+                top=p.get("top", 15),
+                keep=p.get("keep", 48),
+                memory=p.get("memory", True),
+                frames=p.get("frames", 25),
+                tag=tag,
+            ).start()
+        return _default_profiler or _NULL
+
+
+def get_profiler():
+    """获取进程内共享的剖析器（未开启时返回不做任何事的占位对象）"""
+    with _default_lock:
+        return _default_profiler or _NULL
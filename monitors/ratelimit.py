@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为桶容量
+
+    acquire() 在锁内预占令牌并计算需要等待的时间，在锁外休眠，
+    因此多个线程排队时互不阻塞计算，且按到达顺序获得令牌。
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取得一个令牌，返回等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """有令牌时取走一个并返回 True，否则立即返回 False（不等待）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RateLimiter:
+    """按主机划分的限流器，所有监控器共享
+
+    令牌桶按请求的主机名区分，不同主机之间完全并行；
+    桶的参数取自首个访问该主机的 Provider 的配置（未配置时用 default）。
+    """
+
+    def __init__(self, default: Optional[dict] = None, providers: Optional[dict] = None):
+        self.default = default or {}
+        self.providers = {k.strip().lower(): v for k, v in (providers or {}).items()}
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict] = None) -> "RateLimiter":
+        """从 config.json 的 rate_limit 字段构建
+
+        {
+          "rate_limit": {
+            "default": {"rate": 1, "burst": 3},
+            "providers": {
+              "mokahr": {"rate": 0.2, "burst": 2}
+            }
+          }
+        }
+        rate 为每秒请求数；未配置 rate_limit 时不限流。
+        """
+        r = (cfg or {}).get("rate_limit", {})
+        return cls(default=r.get("default"), providers=r.get("providers"))
+
+    def _bucket(self, host: str, provider: Optional[str]) -> Optional[TokenBucket]:
+        with self._lock:
+            if host not in self._buckets:
+                settings = self.providers.get((provider or "").lower(), self.default)
+                rate = settings.get("rate")
+                self._buckets[host] = (
+                    TokenBucket(rate, settings.get("burst", 1)) if rate else None
+                )
+            return self._buckets[host]
+
+    def acquire(self, url: str, provider: Optional[str] = None) -> float:
+        """请求前调用，必要时阻塞直到该主机有可用令牌，返回等待秒数"""
+        host = urlsplit(url).hostname or ""
+        bucket = self._bucket(host, provider)
+        if bucket is None:
+            return 0.0
+        wait = bucket.acquire()
+        if wait > 0:
+            logging.debug(f"{host} 限流等待 {wait:.2f}s")
+        return wait
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def configure_rate_limiter(cfg: Optional[dict] = None) -> RateLimiter:
+    """按配置初始化共享限流器，需在创建监控器之前调用"""
+    global _default_limiter
+    with _default_lock:
+        _default_limiter = RateLimiter.from_config(cfg)
+        return _default_limiter
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取共享限流器（未配置时不限流）"""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
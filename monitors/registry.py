@@ -1,7 +1,26 @@
+import importlib
+import logging
+import pkgutil
 from typing import Dict, Type, Callable
 
 MONITOR_REGISTRY: Dict[str, Type] = {}
 
+# monitors 包中的基础设施模块，不是 Provider
+SUPPORT_MODULES = {
+    "__init__",
+    "registry",
+    "base",
+    "state",
+    "transport",
+    "ratelimit",
+    "coalesce",
+    "cookies",
+    "health",
+    "metrics",
+    "profiling",
+    "spec",
+}
+
 
 def register_monitor(name: str) -> Callable[[Type], Type]:
     """类装饰器：注册监控器到注册表。
@@ -14,11 +33,43 @@ def register_monitor(name: str) -> Callable[[Type], Type]:
 
     def decorator(cls: Type) -> Type:
         key = name.strip().lower()
+        cls.provider_name = key
         MONITOR_REGISTRY[key] = cls
         return cls
 
     return decorator
 
 
+def _import_provider(modname: str) -> None:
+    try:
+        importlib.import_module(f"monitors.{modname}")
+    except ImportError as e:
+        if getattr(e, "name", None) == f"monitors.{modname}":
+            return
+        logging.error(f"加载 provider 模块 monitors.{modname} 失败: {str(e)}")
+
+
 def get_monitor_class(name: str):
-    return MONITOR_REGISTRY.get((name or "").strip().lower())
+    """按名称获取监控器类，首次使用时才导入对应模块
+
+    约定 provider 名称与 monitors 下的模块名相同（如 mokahr → monitors/mokahr.py），
+    只有用到的 provider 才会被导入（例如未配置 MokaHR 时不会加载 pycryptodome）。
+    若模块名与注册名不一致，则退回到扫描整个 monitors 包。
+    """
+    key = (name or "").strip().lower()
+    if not key:
+        return None
+    if key in MONITOR_REGISTRY:
+        return MONITOR_REGISTRY[key]
+
+    if key.isidentifier() and key not in SUPPORT_MODULES:
+        _import_provider(key)
+        if key in MONITOR_REGISTRY:
+            return MONITOR_REGISTRY[key]
+
+    import monitors as monitors_pkg
+
+    for _finder, modname, _ispkg in pkgutil.iter_modules(monitors_pkg.__path__):
+        if modname not in SUPPORT_MODULES:
+            _import_provider(modname)
+    return MONITOR_REGISTRY.get(key)
@@ -0,0 +1,184 @@
+import json
+import threading
+from string import Formatter
+from typing import Any, Callable, Dict, List, Optional
+
+# 模板中代表解码后状态的占位符，如 "{positionName} - {@status}"
+STATUS_FIELD = "@status"
+
+_MISSING = object()
+
+
+def compile_path(path: Optional[str]) -> Callable[[Any], Any]:
+    """把 "data.list.0.id" 这样的路径编译为取值函数，路径不存在时返回 None"""
+    if not path:
+        return lambda obj: obj
+    keys = [int(p) if p.isdigit() else p for p in str(path).split(".")]
+    if len(keys) == 1 and isinstance(keys[0], str):
+        key = keys[0]
+        return lambda obj: obj.get(key) if isinstance(obj, dict) else None
+
+    def get(obj):
+        for k in keys:
+            try:
+                obj = obj[k]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return obj
+
+    return get
+
+
+def compile_template(template: str) -> Callable[[dict, Any], str]:
+    """把 "{positionName} ({projectName})" 这样的模板编译为 render(记录, 状态)
+
+    字段支持点号路径与格式说明（如 "{curProcessNode:.3}" 取前 3 个字符），
+    "{@status}" 为解码后的状态；缺失的字段输出为空字符串。
+    """
+    parts: List[Any] = []
+    for literal, field, fmt, conversion in Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if field is None:
+            continue
+        getter = None if field == STATUS_FIELD else compile_path(field)
+        parts.append((getter, fmt or "", conversion))
+
+    def render(record: dict, status: Any = None) -> str:
+        out = []
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            getter, fmt, conversion = part
+            value = status if getter is None else getter(record)
+            if value is None:
+                value = ""
+            elif conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            out.append(format(value, fmt))
+        return "".join(out)
+
+    return render
+
+
+def compile_status(spec: Any) -> Callable[[dict], Any]:
+    """编译状态解码规则
+
+    - 字符串：直接取该字段的值
+    - {"keys": [模板, ...], "table": {键: 状态}, "default": "未知"}：
+      按顺序用各模板生成查表键，第一个命中的即为状态，都未命中时为 default
+    """
+    if isinstance(spec, str):
+        return compile_path(spec)
+    keys = [compile_template(k) for k in spec.get("keys") or ["{" + spec["path"] + "}"]]
+    table = dict(spec.get("table") or {})
+    default = spec.get("default")
+    if not table:
+        return keys[0]
+
+    def status(record):
+        for key in keys:
+            value = table.get(key(record), _MISSING)
+            if value is not _MISSING:
+                return value
+        return default
+
+    return status
+
+
+def compile_predicate(spec: Optional[dict]) -> Optional[Callable[[Any], bool]]:
+    """编译 {路径: 期望值} 形式的相等判断（全部满足才为真），值为列表时表示其中之一"""
+    if not spec:
+        return None
+    checks = []
+    for path, expected in spec.items():
+        getter = compile_path(path)
+        if isinstance(expected, list):
+            checks.append(lambda obj, g=getter, a=tuple(expected): g(obj) in a)
+        else:
+            checks.append(lambda obj, g=getter, e=expected: g(obj) == e)
+    if len(checks) == 1:
+        return checks[0]
+    return lambda obj: all(check(obj) for check in checks)
+
+
+class ExtractionSpec:
+    """编译后的站点提取规则
+
+    配置示例（以网易雷火为例）：
+    {
+      "base_url": "https://campus.163.com",
+      "endpoint": "/api/campuspc/apply/find",
+      "method": "GET",
+      "timestamp_param": "timeStamp",
+      "success": {"code": 200},
+      "message_path": "msg",
+      "list_path": "data.leihuoList",
+      "filter": {"invalidFlag": 0},
+      "id_field": "id",
+      "title": "{applyPosition} ({projectName})",
+      "status": "applyStatusValue",
+      "format": "{applyPosition} - {@status} ({projectName})"
+    }
+    """
+
+    def __init__(self, spec: dict):
+        if not spec.get("endpoint") or not spec.get("list_path"):
+            raise ValueError("提取规则至少需要 endpoint 与 list_path")
+        self.base_url = spec.get("base_url")
+        self.endpoint = spec["endpoint"]
+        self.method = str(spec.get("method", "GET")).upper()
+        self.params = dict(spec.get("params") or {})
+        self.timestamp_param = spec.get("timestamp_param")
+        self.body = spec.get("body")
+        self.id_field = spec.get("id_field", "id")
+
+        success = spec.get("success", {"code": 0})
+        self.success = compile_predicate(success) or (lambda data: True)
+        self.code = compile_path(next(iter(success), None))
+        self.message = compile_path(spec.get("message_path", "message"))
+        self.items = compile_path(spec["list_path"])
+        self.keep = compile_predicate(spec.get("filter"))
+        self.status = compile_status(spec.get("status", "status"))
+        self._title = compile_template(spec.get("title", "{" + self.id_field + "}"))
+        self._format = (
+            compile_template(spec["format"]) if spec.get("format") else None
+        )
+
+    def records(self, data: Any) -> Optional[list]:
+        """接口成功时返回通过 filter 的记录列表，否则返回 None"""
+        if not isinstance(data, dict) or not self.success(data):
+            return None
+        items = self.items(data)
+        if not isinstance(items, list):
+            return None
+        if self.keep is None:
+            return list(items)
+        return [item for item in items if self.keep(item)]
+
+    def summarize(self, record: dict) -> dict:
+        status = self.status(record)
+        return {"title": self._title(record, status), "stage": status}
+
+    def format_status(self, record: dict) -> str:
+        status = self.status(record)
+        if self._format is None:
+            return f"{self._title(record, status)} - {status}"
+        return self._format(record, status)
+
+
+_compiled: Dict[str, ExtractionSpec] = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_spec(spec: dict) -> ExtractionSpec:
+    """编译提取规则；内容相同的规则只编译一次，由所有使用它的监控器共享"""
+    key = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is None:
+            compiled = _compiled[key] = ExtractionSpec(spec)
+        return compiled
@@ -0,0 +1,423 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+STATE_FILE = os.environ.get("STATE_FILE_PATH", "last_state.json")
+STATE_DB = os.environ.get("STATE_DB_PATH", "state.db")
+
+# 进程的 umask（只能通过设置来读取，因此在导入时、尚无其他线程时读取一次）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_text(path: Path, data: str) -> None:
+    """先写同目录临时文件并 fsync，再原子替换目标文件
+
+    mkstemp 创建的临时文件权限为 0600，替换前改为原文件的权限（新文件按 umask，通常为 0644）。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp = tempfile.mkstemp(
+        prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent)
+    )
+    try:
+        os.chmod(tmp, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def tagged_path(path, tag) -> str:
+    """在文件名与扩展名之间插入标记：outbox.json -> outbox.<tag>.json"""
+    p = Path(path)
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(tag))
+    return str(p.with_name(f"{p.stem}.{safe}{p.suffix}"))
+
+
+class StateStore:
+    """上一轮状态的内存缓存
+
+    启动时读取一次状态文件，之后读写都在内存中完成；
+    flush() 仅在有改动时落盘，先写临时文件再原子替换，进程中途崩溃也不会损坏原文件。
+    所有方法均线程安全。
+    """
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # 串行化落盘，避免旧快照覆盖新快照
+        self._flush_lock = threading.Lock()
+        self._states: Dict[str, Any] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                self._states = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"状态文件读取失败，将以空状态启动: {str(e)}")
+            self._states = {}
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._states.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            if key in self._states and self._states[key] == value:
+                return
+            self._states[key] = value
+            self._dirty = True
+
+    def delete(self, key: str) -> None:
+        """删除一个键（不存在时什么也不做）"""
+        with self._lock:
+            if key in self._states:
+                del self._states[key]
+                self._dirty = True
+
+    def flush(self) -> bool:
+        """将改动写回磁盘，返回是否发生了写入"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return False
+                data = json.dumps(self._states, ensure_ascii=False)
+                self._dirty = False
+            try:
+                atomic_write_text(self.path, data)
+            except OSError as e:
+                with self._lock:
+                    self._dirty = True
+                logging.error(f"状态文件写入失败: {str(e)}")
+                return False
+            return True
+
+    def record(self, key: str, position, status, latency: Optional[float] = None):
+        """记录一次观测；JSON 存储只保留最新状态，不保存历史"""
+
+    def reload(self, companies: List[str]) -> None:
+        """从磁盘重新读取这些公司的状态（含 "公司名#..." 形式的附属键）
+
+        分片模式下公司从其他进程迁移过来时调用，接上对方最后保存的状态。
+        """
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for key, value in saved.items():
+                if key.split("#", 1)[0] in companies:
+                    self._states[key] = value
+
+
+def _decode_value(value):
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        # 兼容早期直接保存的状态字符串
+        return value
+
+
+class HistoryReader:
+    """状态历史查询（timeline / stage_durations / companies）
+
+    直接构造时以只读方式打开数据库：不建表、不导入 last_state.json，也不会写入，
+    供 history.py 等查询工具使用；SqliteStateStore 继承这些查询方法。
+    """
+
+    def __init__(self, path: str = STATE_DB):
+        uri = Path(path).resolve().as_uri() + "?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._db_lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._conn.close()
+
+    def timeline(self, company: str, position=None, limit: int = 100) -> List[tuple]:
+        """状态变化时间线 [(observed_at, position, status), ...]，按时间升序"""
+        sql = "SELECT observed_at, position, status FROM history WHERE changed = 1 AND company = ?"
+        args: list = [company]
+        if position is not None:
+            sql += " AND position = ?"
+            args.append(str(position))
+        sql += " ORDER BY observed_at DESC LIMIT ?"
+        args.append(limit)
+        with self._db_lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return rows[::-1]
+
+    def stage_durations(self, company: str, position=None) -> List[tuple]:
+        """各阶段停留时长 [(position, status, start, seconds), ...]，当前阶段计到此刻"""
+        rows = self.timeline(company, position, limit=-1)
+        result = []
+        next_start: Dict[str, float] = {}
+        now = time.time()
+        for start, pos, status in reversed(rows):
+            end = next_start.get(pos, now)
+            next_start[pos] = start
+            result.append((pos, status, start, end - start))
+        return result[::-1]
+
+    def companies(self) -> List[str]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT company FROM history ORDER BY company"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+
+class SqliteStateStore(HistoryReader):
+    """基于 SQLite 的状态存储，额外保存每次观测的历史
+
+    - latest 表：每个公司的最新状态（JSON 编码），对应 JSON 存储的内容
+    - history 表：只追加的观测记录（公司、岗位、状态、抓取耗时、时间戳），
+      changed=1 标记状态发生变化的行，按 (company, position, observed_at) 建索引
+
+    写入先在内存中累积，flush() 时在一个短事务中批量提交，不会整文件重写；
+    两次 flush 之间不持有数据库写锁，多个进程共用同一个库时只在提交的瞬间互相等待。
+    """
+
+    def __init__(self, path: str = STATE_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 串行化对数据库连接的访问；_lock 只保护内存数据，提交时不会阻塞检查线程
+        self._db_lock = threading.Lock()
+        # 待提交的改动：latest 表 {公司: JSON，None 表示删除}，history 表的行
+        self._pending_latest: Dict[str, Optional[str]] = {}
+        self._pending_history: List[tuple] = []
+        # 分片模式下多个进程共用同一个库，写锁等待时间放宽到 30 秒；
+        # 自动提交模式，事务只在 flush() 中显式开启，不会有事务跨越整轮检查
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS latest (
+                company TEXT PRIMARY KEY,
+                status TEXT
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company TEXT NOT NULL,
+                position TEXT NOT NULL DEFAULT '',
+                status TEXT,
+                observed_at REAL NOT NULL,
+                latency_ms REAL,
+                changed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_company
+                ON history (company, position, observed_at);
+            CREATE INDEX IF NOT EXISTS idx_history_changed
+                ON history (changed, company, position, observed_at);
+            """
+        )
+        self._states: Dict[str, Any] = {
+            company: _decode_value(value)
+            for company, value in self._conn.execute(
+                "SELECT company, status FROM latest"
+            )
+        }
+        # 每个 (公司, 岗位) 最近一次观测到的状态，用于计算 changed 标记
+        self._observed: Dict[tuple, Any] = {}
+        rows = self._conn.execute(
+            """
+            SELECT h.company, h.position, h.status FROM history h
+            JOIN (
+                SELECT company, position, MAX(id) AS id FROM history
+                GROUP BY company, position
+            ) last ON h.id = last.id
+            """
+        )
+        for company, position, status in rows:
+            self._observed[(company, position)] = status
+        self._import_json_state()
+
+    def _import_json_state(self):
+        """首次启用时导入已有的 last_state.json，避免切换后重复提醒"""
+        if self._states or not Path(STATE_FILE).exists():
+            return
+        legacy = StateStore(STATE_FILE)
+        with legacy._lock:
+            states = dict(legacy._states)
+        for key, value in states.items():
+            self.set(key, value)
+        self.flush()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._states.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            if key in self._states and self._states[key] == value:
+                return
+            self._states[key] = value
+            self._pending_latest[key] = json.dumps(value, ensure_ascii=False)
+
+    def delete(self, key: str) -> None:
+        """删除一个键（不存在时什么也不做）"""
+        with self._lock:
+            if key not in self._states:
+                return
+            del self._states[key]
+            self._pending_latest[key] = None
+
+    def record(self, key: str, position, status, latency: Optional[float] = None):
+        position = "" if position is None else str(position)
+        with self._lock:
+            changed = self._observed.get((key, position)) != status
+            self._observed[(key, position)] = status
+            self._pending_history.append(
+                (
+                    key,
+                    position,
+                    status,
+                    time.time(),
+                    None if latency is None else latency * 1000,
+                    int(changed),
+                )
+            )
+
+    def reload(self, companies: List[str]) -> None:
+        """从数据库重新读取这些公司的最新状态（含 "公司名#..." 形式的附属键）
+
+        分片模式下公司从其他进程迁移过来时调用，接上对方最后提交的状态。
+        """
+        if not companies:
+            return
+        latest, observed = [], []
+        with self._db_lock:
+            for company in companies:
+                prefix = company + "#"
+                latest += self._conn.execute(
+                    "SELECT company, status FROM latest "
+                    "WHERE company = ? OR substr(company, 1, ?) = ?",
+                    (company, len(prefix), prefix),
+                ).fetchall()
+                observed += [
+                    (company, position, status)
+                    for position, status in self._conn.execute(
+                        """
+                        SELECT position, status FROM history
+                        WHERE id IN (
+                            SELECT MAX(id) FROM history WHERE company = ? GROUP BY position
+                        )
+                        """,
+                        (company,),
+                    )
+                ]
+        with self._lock:
+            for key, value in latest:
+                # 尚未提交的本地改动更新，保留
+                if key not in self._pending_latest:
+                    self._states[key] = _decode_value(value)
+            for company, position, status in observed:
+                self._observed[(company, position)] = status
+
+    def flush(self) -> bool:
+        """在一个短事务中提交累积的改动，返回是否发生了写入"""
+        with self._lock:
+            if not self._pending_latest and not self._pending_history:
+                return False
+            latest, self._pending_latest = self._pending_latest, {}
+            history, self._pending_history = self._pending_history, []
+        try:
+            with self._db_lock:
+                try:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO latest (company, status) VALUES (?, ?)",
+                        [(k, v) for k, v in latest.items() if v is not None],
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM latest WHERE company = ?",
+                        [(k,) for k, v in latest.items() if v is None],
+                    )
+                    self._conn.executemany(
+                        """
+                        INSERT INTO history
+                            (company, position, status, observed_at, latency_ms, changed)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        history,
+                    )
+                    self._conn.execute("COMMIT")
+                except sqlite3.Error:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            # 未提交的改动放回队列，下次 flush 重试（期间的新改动优先）
+            with self._lock:
+                self._pending_latest = {**latest, **self._pending_latest}
+                self._pending_history = history + self._pending_history
+            logging.error(f"状态数据库写入失败: {str(e)}")
+            return False
+        return True
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def create_state_store(cfg: Optional[dict] = None):
+    """根据 config.json 的 state 字段创建状态存储
+
+    {
+      "state": {
+        "backend": "sqlite",
+        "path": "state.db"
+      }
+    }
+    backend 缺省为 json（即 last_state.json，不保存历史）。
+    """
+    state_cfg = (cfg or {}).get("state", {})
+    backend = str(state_cfg.get("backend", "json")).lower()
+    if backend == "sqlite":
+        return SqliteStateStore(state_cfg.get("path", STATE_DB))
+    if backend != "json":
+        logging.warning(f"未知的状态存储 backend: {backend}，使用 json")
+    return StateStore(state_cfg.get("path", STATE_FILE))
+
+
+def configure_state_store(cfg: Optional[dict] = None):
+    """按配置初始化进程内共享的状态存储，需在创建监控器之前调用"""
+    global _default_store
+    with _default_lock:
+        _default_store = create_state_store(cfg)
+        return _default_store
+
+
+def get_state_store():
+    """获取进程内共享的状态存储（未配置时使用 last_state.json）"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = StateStore(STATE_FILE)
+        return _default_store
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _PooledAdapter(HTTPAdapter):
+    """带默认超时与耗时统计的连接池适配器，被所有监控器的 Session 共享"""
+
+    def __init__(self, transport: "Transport", timeout, **kwargs):
+        self._transport = transport
+        self._timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self._timeout
+        host = urlsplit(request.url).hostname or ""
+        started = time.monotonic()
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+        except Exception:
+            self._transport.record(host, time.monotonic() - started, error=True)
+            raise
+        self._transport.record(host, time.monotonic() - started)
+        return response
+
+
+class Transport:
+    """所有 Provider 共用的 HTTP 传输层
+
+    - 同一主机的 keep-alive 连接在所有监控器之间复用（例如雷火与互娱都访问 163.com）
+    - 默认连接/读取超时，调用方显式传入 timeout 时以调用方为准
+    - 连接错误与 5xx 按指数退避重试：只重试幂等方法（GET 等），POST 仅限通过 read_only() 声明为
+      只读查询的地址；不按 Retry-After 等待，避免一个 503 让检查线程越过截止时间
+    - 按主机统计请求次数、错误次数与耗时
+
+    每个监控器仍持有独立的 Session（Cookie 互不干扰），只共享底层连接池。
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        def adapter(methods):
+            retry = Retry(
+                total=retries,
+                connect=retries,
+                read=retries,
+                status=retries,
+                backoff_factor=backoff,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=methods,
+                respect_retry_after_header=False,
+                raise_on_status=False,
+            )
+            return _PooledAdapter(
+                self,
+                (connect_timeout, read_timeout),
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=retry,
+            )
+
+        self._adapter = adapter(Retry.DEFAULT_ALLOWED_METHODS)
+        # 只读查询的 POST 接口（见 read_only）使用的适配器，POST 同样可以重试
+        self._query_adapter = adapter(Retry.DEFAULT_ALLOWED_METHODS | {"POST"})
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict] = None) -> "Transport":
+        """从 config.json 的 http 字段构建
+
+        {
+          "http": {
+            "pool_connections": 10,
+            "pool_maxsize": 10,
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "retries": 2,
+            "backoff": 0.5
+          }
+        }
+        """
+        h = (cfg or {}).get("http", {})
+        return cls(
+            pool_connections=h.get("pool_connections", 10),
+            pool_maxsize=h.get("pool_maxsize", 10),
+            connect_timeout=h.get("connect_timeout", 5),
+            read_timeout=h.get("read_timeout", 30),
+            retries=h.get("retries", 2),
+            backoff=h.get("backoff", 0.5),
+        )
+
+    def session(self) -> requests.Session:
+        """创建挂载共享连接池的新 Session"""
+        session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        return session
+
+    def read_only(self, session: requests.Session, url: str) -> None:
+        """声明以 url 开头的 POST 请求是只读查询（重复发送没有副作用），失败时可以重试"""
+        session.mount(url, self._query_adapter)
+
+    def record(self, host: str, latency: float, error: bool = False) -> None:
+        with self._lock:
+            s = self._stats.setdefault(
+                host, {"requests": 0, "errors": 0, "total_latency": 0.0, "last_latency": 0.0}
+            )
+            s["requests"] += 1
+            s["errors"] += int(error)
+            s["total_latency"] += latency
+            s["last_latency"] = latency
+        logging.debug(f"HTTP {host} {latency * 1000:.0f}ms{' (失败)' if error else ''}")
+
+    def stats(self) -> Dict[str, dict]:
+        """按主机汇总：请求数、错误数、平均与最近一次耗时（秒）"""
+        with self._lock:
+            return {
+                host: {
+                    "requests": s["requests"],
+                    "errors": s["errors"],
+                    "avg_latency": s["total_latency"] / s["requests"],
+                    "last_latency": s["last_latency"],
+                }
+                for host, s in self._stats.items()
+            }
+
+
+_default_transport: Optional[Transport] = None
+_default_lock = threading.Lock()
+
+
+def configure_transport(cfg: Optional[dict] = None) -> Transport:
+    """按配置初始化共享传输层，需在创建监控器之前调用"""
+    global _default_transport
+    with _default_lock:
+        _default_transport = Transport.from_config(cfg)
+        return _default_transport
+
+
+def get_transport() -> Transport:
+    """获取共享传输层（未配置时使用默认参数）"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
@@ -0,0 +1,539 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from channels.base import Channel
+from channels.registry import get_channel_class
+from monitors.metrics import get_metrics
+from monitors.state import atomic_write_text, tagged_path
+
+OUTBOX_FILE = os.environ.get("OUTBOX_PATH", "outbox.json")
+
+
+class Outbox:
+    """持久化的待发送通知队列
+
+    每条通知先写入磁盘再投递，投递成功后才移除；进程重启后未投递的通知会继续发送。
+    条目格式：{"id", "subject", "body", "created", "attempts", "next_attempt", "held"}，
+    created 为 Unix 时间戳，next_attempt 为下一次允许投递的时间；
+    held 为 True 的条目是 digest 模式下等待合并的变更，不会被单独投递。
+    """
+
+    def __init__(self, path: str = OUTBOX_FILE):
+        self.path = Path(path)
+        self._items: List[dict] = []
+        if self.path.exists():
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    self._items = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"通知队列文件读取失败，将以空队列启动: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, subject: str, body: str, held: bool = False, **extra) -> dict:
+        now = time.time()
+        item = {
+            "id": uuid.uuid4().hex,
+            "subject": subject,
+            "body": body,
+            "created": now,
+            "attempts": 0,
+            "next_attempt": now,
+            "held": held,
+            **extra,
+        }
+        self._items.append(item)
+        self.save()
+        return item
+
+    def remove(self, item: dict) -> None:
+        self._items = [i for i in self._items if i["id"] != item["id"]]
+        self.save()
+
+    def take_held(self) -> List[dict]:
+        """取出所有 held 条目（调用方负责随后 save）"""
+        held = [i for i in self._items if i.get("held")]
+        self._items = [i for i in self._items if not i.get("held")]
+        return held
+
+    def held_since(self) -> Optional[float]:
+        """最早一条 held 条目的入队时间，没有 held 条目时为 None"""
+        return min(
+            (i["created"] for i in self._items if i.get("held")), default=None
+        )
+
+    def due(self, now: float) -> List[dict]:
+        return [
+            i for i in self._items if not i.get("held") and i["next_attempt"] <= now
+        ]
+
+    def next_due(self) -> Optional[float]:
+        return min(
+            (i["next_attempt"] for i in self._items if not i.get("held")),
+            default=None,
+        )
+
+    def save(self) -> None:
+        try:
+            atomic_write_text(self.path, json.dumps(self._items, ensure_ascii=False))
+        except OSError as e:
+            logging.error(f"通知队列文件写入失败: {str(e)}")
+
+
+class Dispatcher:
+    """单个通知渠道的分发器
+
+    - notify() 把通知写入该渠道的持久化队列（Outbox）后立即返回，不阻塞轮询线程
+    - 后台线程通过渠道投递（渠道可复用连接），空闲超过 idle_timeout 秒后断开
+    - 投递失败按指数退避重试（retry_base 秒起，翻倍至 retry_max 秒），
+      超过 max_attempts 次后放弃（0 表示不限次数）
+    - digest 模式下，第一条变更入队 digest_window 秒后，期间的所有变更合并为一条通知
+      （按时间而不是按检查批次：各公司的检查时间互相错开，每批往往只有一两家公司）
+    """
+
+    def __init__(
+        self,
+        channel: Channel,
+        digest: bool = False,
+        digest_window: float = 900.0,
+        idle_timeout: float = 60.0,
+        outbox_path: str = OUTBOX_FILE,
+        retry_base: float = 30.0,
+        retry_max: float = 3600.0,
+        max_attempts: int = 0,
+    ):
+        self.channel = channel
+        self.digest = digest
+        self.digest_window = float(digest_window)
+        self.idle_timeout = idle_timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_attempts = max_attempts
+        self.delivered = 0
+        self.last_latency: Optional[float] = None
+        self._latency_total = 0.0
+        self._cond = threading.Condition()
+        self._closing = False
+        self._delivering = False
+        self._outbox = Outbox(outbox_path)
+        if len(self._outbox):
+            logging.info(
+                f"[{channel.name}] 通知队列中有 {len(self._outbox)} 条未投递的通知，将继续发送"
+            )
+        self._thread = threading.Thread(
+            target=self._worker, name=f"notify-{channel.name}", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def from_config(
+        cls, cfg: dict, channel: Channel, entry: Optional[dict] = None, outbox_path: Optional[str] = None
+    ) -> "Dispatcher":
+        """从 config.json 构建，notification 字段可选
+
+        {
+          "notification": {
+            "digest": false,
+            "digest_window": 900,
+            "idle_timeout": 60,
+            "outbox": "outbox.json",
+            "retry_base": 30,
+            "retry_max": 3600,
+            "max_attempts": 0
+          }
+        }
+        entry 为渠道条目，其中的同名字段（outbox 除外）覆盖 notification 中的设置。
+        """
+        n = {**cfg.get("notification", {}), **(entry or {})}
+        return cls(
+            channel,
+            digest=bool(n.get("digest", False)),
+            digest_window=n.get("digest_window", 900),
+            idle_timeout=n.get("idle_timeout", 60),
+            outbox_path=outbox_path or cfg.get("notification", {}).get("outbox", OUTBOX_FILE),
+            retry_base=n.get("retry_base", 30),
+            retry_max=n.get("retry_max", 3600),
+            max_attempts=n.get("max_attempts", 0),
+        )
+
+    # --- 生产者接口（轮询线程调用） ---
+    def notify(self, company_name: str, status: str) -> None:
+        # digest 模式下变更同样先落盘（held），由后台线程在 digest_window 秒后合并投递
+        with self._cond:
+            self._outbox.add(
+                f"[校招状态] {company_name} 进度更新",
+                f"{company_name}状态更新：{status}",
+                held=self.digest,
+                company=company_name,
+                status=status,
+            )
+            self._cond.notify_all()
+
+    def flush_digest(self) -> None:
+        """立即把 held 的变更合并成一条通知入队（含重启前遗留的 held 条目），不等 digest_window"""
+        with self._cond:
+            if self._merge_held():
+                self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """等待当前可投递的通知处理完（成功或进入退避），返回队列是否已清空"""
+        self.flush_digest()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._outbox.due(time.time()) or self._delivering:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return len(self._outbox) == 0
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """停止后台线程；未投递的通知保留在队列文件中，下次启动继续发送"""
+        self.flush_digest()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    # --- 观测指标 ---
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._outbox)
+
+    def stats(self) -> dict:
+        """队列深度与投递延迟（从入队到投递成功，秒）"""
+        with self._cond:
+            return {
+                "queue_depth": len(self._outbox),
+                "delivered": self.delivered,
+                "last_latency": self.last_latency,
+                "avg_latency": (
+                    self._latency_total / self.delivered if self.delivered else None
+                ),
+            }
+
+    # --- 内部方法 ---
+    def _merge_held(self) -> bool:
+        """把 held 的变更合并成一条通知入队（调用方持有 _cond），返回是否有可合并的变更"""
+        held = self._outbox.take_held()
+        if not held:
+            return False
+        names = "、".join(i.get("company", i["subject"]) for i in held)
+        body = "\n".join(i["body"] for i in held)
+        self._outbox.add(
+            f"[校招状态] {names} 进度更新",
+            body,
+            created=min(i["created"] for i in held),
+            changes=[
+                {"company": i.get("company"), "status": i.get("status")} for i in held
+            ],
+        )
+        return True
+
+    def _deliver(self, item: dict) -> None:
+        metrics = get_metrics()
+        name = self.channel.name
+        try:
+            with metrics.timer("offerchecker_notification_seconds", channel=name):
+                self.channel.send(item)
+        except Exception as e:
+            self.channel.disconnect()
+            with self._cond:
+                item["attempts"] += 1
+                if self.max_attempts and item["attempts"] >= self.max_attempts:
+                    logging.error(
+                        f"[{name}] 通知发送失败，已重试 {item['attempts']} 次，放弃: "
+                        f"{item['subject']} ({str(e)})"
+                    )
+                    self._outbox.remove(item)
+                    metrics.inc(
+                        "offerchecker_notifications_total", channel=name, result="dropped"
+                    )
+                    return
+                delay = min(
+                    self.retry_base * 2 ** (item["attempts"] - 1), self.retry_max
+                )
+                item["next_attempt"] = time.time() + delay
+                self._outbox.save()
+            metrics.inc("offerchecker_notifications_total", channel=name, result="failed")
+            logging.error(f"[{name}] 通知发送失败，{delay:.0f} 秒后重试: {str(e)}")
+            return
+
+        latency = time.time() - item["created"]
+        with self._cond:
+            self._outbox.remove(item)
+            self.delivered += 1
+            self.last_latency = latency
+            self._latency_total += latency
+        metrics.inc("offerchecker_notifications_total", channel=name, result="sent")
+        logging.info(f"[{name}] 通知发送成功 - {item['subject']} (延迟 {latency:.1f}s)")
+
+    def _worker(self) -> None:
+        idle_since = time.monotonic()
+        connected = False
+        while True:
+            with self._cond:
+                if self._closing:
+                    break
+                now = time.time()
+                held_since = self._outbox.held_since()
+                if held_since is not None and now >= held_since + self.digest_window:
+                    self._merge_held()
+                    held_since = None
+                due = self._outbox.due(now)
+                self._delivering = bool(due)
+                if not due:
+                    next_due = self._outbox.next_due()
+                    if held_since is not None:
+                        next_due = min(
+                            held_since + self.digest_window,
+                            next_due if next_due is not None else float("inf"),
+                        )
+                    wait = self.idle_timeout
+                    if next_due is not None:
+                        wait = min(wait, max(0.0, next_due - now))
+                    self._cond.wait(wait)
+            if not due:
+                if connected and time.monotonic() - idle_since >= self.idle_timeout:
+                    self.channel.disconnect()
+                    connected = False
+                continue
+            for item in due:
+                self._deliver(item)
+            with self._cond:
+                self._delivering = False
+                self._cond.notify_all()
+            idle_since = time.monotonic()
+            connected = True
+        self.channel.close()
+
+
+def build_channels(cfg: dict) -> List[Tuple[dict, Channel]]:
+    """按 channels 字段创建通知渠道，返回 [(渠道条目, 渠道)]；配置有误时抛出 ValueError
+
+    未配置 channels 时只使用邮件渠道（顶层 email），与原来的行为一致。
+    """
+    entries = cfg.get("channels")
+    if entries is None:
+        entries = [{"type": "email"}]
+    built, names = [], set()
+    for entry in entries:
+        cls = get_channel_class(entry.get("type", ""))
+        if cls is None:
+            raise ValueError(f"未知的通知渠道类型: {entry.get('type')}")
+        channel = cls.from_config(entry, cfg)
+        if channel.name in names:
+            raise ValueError(f"通知渠道名称重复: {channel.name}（可用 name 字段区分）")
+        names.add(channel.name)
+        built.append((entry, channel))
+    return built
+
+
+class FanoutNotifier:
+    """多渠道通知：每个渠道一个 Dispatcher（各自的后台线程与通知队列）
+
+    一条变更同时写入所有渠道的队列，各渠道并行投递、各自重试，
+    某个渠道变慢或不可用不会拖慢其他渠道，也不会阻塞轮询。
+    名为 email 的渠道沿用 notification.outbox（默认 outbox.json），
+    其余渠道的队列为 outbox.<渠道名>.json。
+    """
+
+    def __init__(self, dispatchers: List[Dispatcher]):
+        self.dispatchers = dispatchers
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "FanoutNotifier":
+        """从 config.json 构建，channels 字段可选
+
+        {
+          "channels": [
+            {"type": "email"},
+            {"type": "webhook", "url": "https://example.com/hooks/offer", "timeout": 10},
+            {"type": "bot", "preset": "feishu", "url": "https://open.feishu.cn/open-apis/bot/v2/hook/..."}
+          ]
+        }
+        """
+        outbox = cfg.get("notification", {}).get("outbox", OUTBOX_FILE)
+        dispatchers = []
+        for entry, channel in build_channels(cfg):
+            path = outbox if channel.name == "email" else tagged_path(outbox, channel.name)
+            dispatchers.append(
+                Dispatcher.from_config(cfg, channel, entry=entry, outbox_path=path)
+            )
+        return cls(dispatchers)
+
+    def notify(self, company_name: str, status: str) -> None:
+        for d in self.dispatchers:
+            d.notify(company_name, status)
+
+    def flush_digest(self) -> None:
+        for d in self.dispatchers:
+            d.flush_digest()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ok = True
+        for d in self.dispatchers:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ok = d.drain(remaining) and ok
+        return ok
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        for d in self.dispatchers:
+            d.close(timeout)
+
+    def queue_depth(self) -> int:
+        return sum(d.queue_depth() for d in self.dispatchers)
+
+    def stats(self) -> Dict[str, dict]:
+        """各渠道的队列深度与投递延迟"""
+        return {d.channel.name: d.stats() for d in self.dispatchers}
+
+
+class TenantNotifier:
+    """多用户通知：每个用户一个 FanoutNotifier（各自的收件人、渠道与通知队列），按公司名分发
+
+    接口与 FanoutNotifier 相同，主循环无需区分单用户与多用户。
+    用户的分发器在第一次有通知时才创建（启动分发线程、读取队列文件），
+    只有队列文件中有遗留通知的用户在启动时立即创建，继续发送。
+    """
+
+    def __init__(
+        self,
+        default: FanoutNotifier,
+        dispatchers: Dict[str, FanoutNotifier],
+        tenant_of: Dict[str, str],
+        configs: Optional[Dict[str, dict]] = None,
+    ):
+        self.default = default
+        self.dispatchers = dispatchers
+        self._tenant_of = tenant_of
+        # 尚未创建分发器的用户配置（用户名 -> 构建 FanoutNotifier 用的配置）
+        self._configs = dict(configs or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: dict, worker: Optional[int] = None) -> "TenantNotifier":
+        """cfg 为展开后的配置（见 tenants.expand_tenants），只为其中出现的用户准备分发器
+
+        用户的 email 字段覆盖顶层 email（通常只需 receiver），channels 字段（可选）整体替换顶层 channels，
+        通知队列为 outbox.<用户名>.json（其他渠道为 outbox.<用户名>.<渠道名>.json）；
+        worker 不为空时（分片模式），所有队列再按进程编号区分（outbox.<用户名>.<编号>.json），
+        每个队列文件只有一个写入者。用户迁往其他进程后，本进程仍为队列中未发出的通知创建分发器，
+        发完为止；其余不归本进程负责的用户不会创建分发器。
+        """
+        n = cfg.get("notification", {})
+        outbox = n.get("outbox", OUTBOX_FILE)
+        default_cfg = cfg
+        if worker is not None:
+            default_cfg = {**cfg, "notification": {**n, "outbox": tagged_path(outbox, worker)}}
+        default = FanoutNotifier.from_config(default_cfg)
+
+        tenant_of = {
+            c["name"]: c["tenant"] for c in cfg.get("companies", []) if c.get("tenant")
+        }
+        owned = set(tenant_of.values())
+        pending = _pending_tenants(outbox, worker)
+        configs, dispatchers = {}, {}
+        for tenant in cfg.get("tenants") or []:
+            name = tenant["name"]
+            safe = Path(tagged_path(outbox, name)).stem.split(".")[-1]
+            if name not in owned and safe not in pending:
+                continue
+            path = tagged_path(outbox, name)
+            if worker is not None:
+                path = tagged_path(path, worker)
+            tenant_cfg = {
+                **cfg,
+                "email": {**cfg.get("email", {}), **tenant.get("email", {})},
+                "notification": {**n, "outbox": path},
+            }
+            if "channels" in tenant:
+                tenant_cfg["channels"] = tenant["channels"]
+            if safe in pending:
+                # 有遗留通知（含已迁往其他进程的用户），立即继续发送
+                dispatchers[name] = FanoutNotifier.from_config(tenant_cfg)
+            else:
+                configs[name] = tenant_cfg
+        return cls(default, dispatchers, tenant_of, configs)
+
+    def _dispatcher(self, tenant: Optional[str]) -> FanoutNotifier:
+        """用户的分发器，第一次使用时创建；非多用户条目使用默认分发器"""
+        if tenant is None:
+            return self.default
+        with self._lock:
+            fanout = self.dispatchers.get(tenant)
+            if fanout is None:
+                tenant_cfg = self._configs.pop(tenant, None)
+                if tenant_cfg is None:
+                    return self.default
+                fanout = self.dispatchers[tenant] = FanoutNotifier.from_config(tenant_cfg)
+            return fanout
+
+    def _all(self) -> List[FanoutNotifier]:
+        with self._lock:
+            return [self.default, *self.dispatchers.values()]
+
+    def notify(self, company_name: str, status: str) -> None:
+        self._dispatcher(self._tenant_of.get(company_name)).notify(company_name, status)
+
+    def flush_digest(self) -> None:
+        for d in self._all():
+            d.flush_digest()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ok = True
+        for d in self._all():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ok = d.drain(remaining) and ok
+        return ok
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        for d in self._all():
+            d.close(timeout)
+
+    def queue_depth(self) -> int:
+        return sum(d.queue_depth() for d in self._all())
+
+
+def _pending_tenants(outbox: str, worker: Optional[int] = None) -> Set[str]:
+    """队列文件中还有未投递通知的用户（文件名中的用户名部分），只列一次目录
+
+    用户的队列文件为 outbox.<用户名>[.<进程编号>][.<渠道名>].json（见 TenantNotifier），
+    用户名中的 "." 已被替换，因此第一段即为用户名；分片模式下只看本进程编号的文件。
+    """
+    base = Path(outbox)
+    prefix = base.stem + "."
+    found = set()
+    try:
+        files = list(os.scandir(base.parent if str(base.parent) else "."))
+    except OSError:
+        return found
+    for f in files:
+        if not (f.name.startswith(prefix) and f.name.endswith(base.suffix)):
+            continue
+        parts = f.name[len(prefix):len(f.name) - len(base.suffix)].split(".")
+        if worker is not None and (len(parts) < 2 or parts[1] != str(worker)):
+            continue
+        try:
+            # 空队列文件内容为 "[]"
+            if f.stat().st_size > 2:
+                found.add(parts[0])
+        except OSError:
+            continue
+    return found
+
+
+def create_notifier(cfg: dict, worker: Optional[int] = None):
+    """单用户配置返回 FanoutNotifier，多用户或分片模式返回 TenantNotifier"""
+    if cfg.get("tenants") or worker is not None:
+        return TenantNotifier.from_config(cfg, worker=worker)
+    return FanoutNotifier.from_config(cfg)
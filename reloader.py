@@ -0,0 +1,59 @@
+import logging
+import os
+import signal
+import threading
+
+
+class ConfigWatcher:
+    """检测配置文件是否需要重新加载
+
+    两种触发方式：
+    - 轮询配置文件（以及 extra_paths，如分片文件）的修改时间与大小（poll_seconds 秒一次，由主循环调用 changed()）
+    - 收到 SIGHUP 信号（仅在支持该信号的平台上注册）
+    """
+
+    def __init__(self, path: str, poll_seconds: float = 5.0, extra_paths=()):
+        self.path = path
+        self.paths = [path, *extra_paths]
+        self.poll_seconds = float(poll_seconds)
+        self._signature = self._stat()
+        self._requested = threading.Event()
+        if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, self._on_signal)
+
+    @classmethod
+    def from_config(cls, path: str, cfg: dict, extra_paths=()) -> "ConfigWatcher":
+        """从 config.json 的 reload 字段构建
+
+        {
+          "reload": {
+            "poll_seconds": 5
+          }
+        }
+        """
+        r = cfg.get("reload", {})
+        return cls(path, poll_seconds=r.get("poll_seconds", 5), extra_paths=extra_paths)
+
+    def _stat(self):
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            signature.append((st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def _on_signal(self, _signum, _frame):
+        logging.info("收到 SIGHUP，将在本轮结束后重新加载配置")
+        self._requested.set()
+
+    def changed(self) -> bool:
+        """配置文件有变化或收到重载信号时返回 True（每次变化只返回一次）"""
+        signature = self._stat()
+        requested = self._requested.is_set()
+        self._requested.clear()
+        if signature is not None and signature != self._signature:
+            self._signature = signature
+            return True
+        return requested
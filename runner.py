@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 单个监控器在一轮中的执行结果
+RESULT_CHANGED = "changed"
+RESULT_UNCHANGED = "unchanged"
+RESULT_LOGIN_FAILED = "login_failed"
+RESULT_AUTH_FAILED = "auth_failed"
+RESULT_ERROR = "error"
+RESULT_TIMEOUT = "timeout"
+RESULT_SKIPPED = "skipped"
+# 启用租约时由其他副本负责检查
+RESULT_LEASED = "leased"
+
+
+class _Task:
+    """一次监控器检查任务，在独立的守护线程中运行"""
+
+    def __init__(self, monitor, notifier, done: threading.Condition):
+        self.monitor = monitor
+        self.result: Optional[str] = None
+        self.started = time.monotonic()
+        self._notifier = notifier
+        self._done = done
+        self.thread = threading.Thread(
+            target=self._run,
+            name=f"monitor-{monitor.company_name}",
+            daemon=True,
+        )
+
+    def _run(self):
+        try:
+            if self.monitor.login():
+                changed = self.monitor.check_update(self._notifier)
+                if changed is None:
+                    breaker = getattr(self.monitor, "breaker", None)
+                    if breaker is not None and breaker.is_open:
+                        result = RESULT_AUTH_FAILED
+                    else:
+                        result = RESULT_ERROR
+                else:
+                    result = RESULT_CHANGED if changed else RESULT_UNCHANGED
+            else:
+                logging.warning(f"{self.monitor.company_name} 登录失败")
+                result = RESULT_LOGIN_FAILED
+        except Exception as e:
+            logging.error(f"{self.monitor.company_name} 检查异常: {str(e)}")
+            result = RESULT_ERROR
+        with self._done:
+            self.result = result
+            self._done.notify_all()
+
+
+class ConcurrentRunner:
+    """并发执行一轮检查
+
+    - max_workers：同时运行的监控器数量上限
+    - timeout：单个监控器的截止时间（秒），超时后不再等待并记为 timeout
+
+    线程无法被强制终止，超时的监控器会被放弃（守护线程，不阻塞退出），
+    在其线程真正结束前，后续轮次会跳过该监控器，避免同一站点堆积请求。
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: float = 120.0):
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = float(timeout)
+        self._hung: Dict[int, _Task] = {}
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict] = None) -> "ConcurrentRunner":
+        """从 config.json 的 concurrency 字段构建
+
+        {
+          "concurrency": {
+            "max_workers": 4,
+            "timeout_seconds": 120
+          }
+        }
+        """
+        c = (cfg or {}).get("concurrency", {})
+        return cls(
+            max_workers=c.get("max_workers", 4),
+            timeout=c.get("timeout_seconds", 120),
+        )
+
+    def run_round(self, monitors: List, notifier) -> Dict[str, str]:
+        """执行一轮检查，返回 {公司名: 结果}，耗时约等于最慢站点（且不超过截止时间）"""
+        results: Dict[str, str] = {}
+        queue = []
+        for monitor in monitors:
+            hung = self._hung.get(id(monitor))
+            if hung is not None:
+                if hung.thread.is_alive():
+                    logging.warning(
+                        f"{monitor.company_name} 上一轮检查仍未结束，本轮跳过"
+                    )
+                    results[monitor.company_name] = RESULT_SKIPPED
+                    continue
+                del self._hung[id(monitor)]
+            queue.append(monitor)
+
+        done = threading.Condition()
+        running: List[_Task] = []
+        with done:
+            while queue or running:
+                while queue and len(running) < self.max_workers:
+                    task = _Task(queue.pop(0), notifier, done)
+                    running.append(task)
+                    task.thread.start()
+
+                now = time.monotonic()
+                for task in list(running):
+                    name = task.monitor.company_name
+                    if task.result is not None:
+                        results[name] = task.result
+                        running.remove(task)
+                    elif now - task.started >= self.timeout:
+                        logging.error(
+                            f"{name} 检查超过 {self.timeout:g} 秒未完成，已放弃等待"
+                        )
+                        results[name] = RESULT_TIMEOUT
+                        self._hung[id(task.monitor)] = task
+                        running.remove(task)
+
+                if running and not (queue and len(running) < self.max_workers):
+                    nearest = min(t.started for t in running) + self.timeout
+                    done.wait(max(0.0, nearest - time.monotonic()))
+
+        return results
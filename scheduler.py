@@ -0,0 +1,234 @@
+import datetime
+import heapq
+import itertools
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from runner import RESULT_CHANGED, RESULT_LEASED, RESULT_UNCHANGED
+
+# 由其他进程持有租约的公司，隔多少秒再尝试申请（不超过正常间隔）
+LEASE_RETRY = 60.0
+
+
+class MonitorSchedule:
+    """单个监控器的轮询节奏
+
+    - 检测到变化后间隔收紧到 min_interval
+    - 状态保持不变时间隔按 backoff 倍数放宽，最多到 max_interval
+    - 检查失败（超时、登录失败等）时保持当前间隔
+    - 租约由其他进程持有时，LEASE_RETRY 秒后再尝试（对方释放后尽快接手），不改变当前间隔
+    - 下一次检查时间附加 ±jitter 比例的随机抖动，且只落在 [start_hour, end_hour) 时段内
+    - group 相同（同一账号）的监控器由调度器对齐到期时间，见 Scheduler
+    """
+
+    def __init__(
+        self,
+        monitor,
+        interval: float,
+        min_interval: float,
+        max_interval: float,
+        backoff: float = 2.0,
+        jitter: float = 0.1,
+        start_hour: int = 0,
+        end_hour: int = 24,
+        group=None,
+    ):
+        self.monitor = monitor
+        self.interval = float(interval)
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.backoff = float(backoff)
+        self.jitter = float(jitter)
+        self.start_hour = int(start_hour)
+        self.end_hour = int(end_hour)
+        self.group = group
+        self.current = self.interval
+        self._leased = False
+
+    def in_window(self, when: datetime.datetime) -> bool:
+        return self.start_hour <= when.hour < self.end_hour
+
+    def until_window(self, when: datetime.datetime) -> float:
+        """距离下一个工作时段开始的秒数（已在时段内则为 0）"""
+        if self.in_window(when):
+            return 0.0
+        start = when.replace(hour=self.start_hour, minute=0, second=0, microsecond=0)
+        if when.hour >= self.end_hour:
+            start += datetime.timedelta(days=1)
+        return (start - when).total_seconds()
+
+    def on_result(self, result: str) -> None:
+        self._leased = result == RESULT_LEASED
+        if result == RESULT_CHANGED:
+            self.current = self.min_interval
+        elif result == RESULT_UNCHANGED:
+            self.current = min(self.current * self.backoff, self.max_interval)
+
+    def next_delay(
+        self, now: Optional[datetime.datetime] = None, spread: Optional[float] = None
+    ) -> float:
+        """距离下一次检查的秒数
+
+        spread 为 [-1, 1] 内的抖动系数（实际抖动为 spread * jitter），缺省时随机取值。
+        """
+        now = now or datetime.datetime.now()
+        delay = min(self.current, LEASE_RETRY) if self._leased else self.current
+        if self.jitter:
+            if spread is None:
+                spread = random.uniform(-1.0, 1.0)
+            delay *= 1 + spread * self.jitter
+        delay = max(delay, 1.0)
+        wait = self.until_window(now + datetime.timedelta(seconds=delay))
+        return delay + wait
+
+
+class Scheduler:
+    """基于优先队列的调度器，到期时间使用单调时钟
+
+    同一账号（group 相同）的监控器尽量在同一批中检查，以便请求合并生效：
+    - 同一批重新安排的同组监控器使用相同的抖动系数，间隔相同时下一次仍同时到期
+    - 某个监控器到期时，同组中在其抖动范围内即将到期的监控器一并提前取出
+    """
+
+    def __init__(self, schedules: List[MonitorSchedule]):
+        self._heap: List[Tuple[float, int, MonitorSchedule]] = []
+        self._seq = itertools.count()
+        self._schedules: Dict[int, MonitorSchedule] = {}
+        # 本批各组的抖动系数，pop_due() 时清空
+        self._spreads: Dict[object, float] = {}
+        self._add(schedules)
+
+    @classmethod
+    def from_config(cls, cfg: dict, monitors: List[Tuple[object, dict]]) -> "Scheduler":
+        """根据全局与公司级配置构建
+
+        全局默认：sleep_seconds、WORK_HOURS 以及可选的 schedule 字段；
+        公司条目中的 schedule 字段可覆盖任意一项：
+        {
+          "schedule": {
+            "interval": 3600,
+            "min_interval": 1800,
+            "max_interval": 14400,
+            "backoff": 2,
+            "jitter": 0.1,
+            "work_hours": {"start_hour": 10, "end_hour": 20}
+          }
+        }
+        """
+        return cls(cls._build(cfg, monitors))
+
+    @staticmethod
+    def _build(cfg: dict, monitors: List[Tuple[object, dict]]) -> List[MonitorSchedule]:
+        defaults = {
+            "interval": cfg.get("sleep_seconds", 3600),
+            "work_hours": cfg.get("WORK_HOURS", {}),
+            **cfg.get("schedule", {}),
+        }
+        schedules = []
+        for monitor, company in monitors:
+            s = {**defaults, **company.get("schedule", {})}
+            interval = float(s["interval"])
+            hours = s.get("work_hours") or {}
+            schedules.append(
+                MonitorSchedule(
+                    monitor,
+                    interval=interval,
+                    min_interval=s.get("min_interval", interval / 2),
+                    # 缺省不放宽：只有显式配置 max_interval 才会在状态不变时降低检查频率
+                    max_interval=s.get("max_interval", interval),
+                    backoff=s.get("backoff", 2),
+                    jitter=s.get("jitter", 0.1),
+                    start_hour=hours.get("start_hour", 0),
+                    end_hour=hours.get("end_hour", 24),
+                    group=monitor.account_key(),
+                )
+            )
+        return schedules
+
+    def update(self, cfg: dict, monitors: List[Tuple[object, dict]]) -> None:
+        """配置重载后同步调度
+
+        - 仍在的监控器保留当前间隔与下一次检查时间，只更新参数
+        - 新监控器立即（或在其工作时段开始时）安排检查
+        - 已移除的监控器不再被调度
+        """
+        new_schedules = self._build(cfg, monitors)
+        keep = {id(s.monitor) for s in new_schedules}
+        for key in list(self._schedules):
+            if key not in keep:
+                del self._schedules[key]
+
+        added = []
+        for new in new_schedules:
+            old = self._schedules.get(id(new.monitor))
+            if old is None:
+                added.append(new)
+                continue
+            current = min(max(old.current, new.min_interval), new.max_interval)
+            old.__dict__.update(new.__dict__)
+            old.current = current
+        self._add(added)
+
+    def _add(self, schedules: List[MonitorSchedule]) -> None:
+        now = datetime.datetime.now()
+        mono = time.monotonic()
+        for s in schedules:
+            self._schedules[id(s.monitor)] = s
+            self._push(mono + s.until_window(now), s)
+
+    def _push(self, due: float, schedule: MonitorSchedule) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), schedule))
+
+    def _drop_stale(self) -> None:
+        # 已移除或被替换的调度项在堆中惰性删除
+        while self._heap and self._schedules.get(
+            id(self._heap[0][2].monitor)
+        ) is not self._heap[0][2]:
+            heapq.heappop(self._heap)
+
+    def pop_due(self) -> List:
+        """取出所有已到期的监控器，以及与其同组、在抖动范围内即将到期的监控器"""
+        now = time.monotonic()
+        due = []
+        self._spreads.clear()
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+            self._drop_stale()
+        groups = {s.group for s in due if s.group is not None}
+        if groups:
+            rest = []
+            for entry in self._heap:
+                at, _seq, s = entry
+                if (
+                    s.group in groups
+                    and self._schedules.get(id(s.monitor)) is s
+                    and at - now <= s.jitter * s.current
+                ):
+                    due.append(s)
+                else:
+                    rest.append(entry)
+            if len(rest) != len(self._heap):
+                heapq.heapify(rest)
+                self._heap = rest
+        return [s.monitor for s in due]
+
+    def reschedule(self, monitor, result: str) -> Optional[float]:
+        """根据本次结果安排下一次检查，返回延迟秒数；监控器已被移除时返回 None"""
+        schedule = self._schedules.get(id(monitor))
+        if schedule is None or schedule.monitor is not monitor:
+            return None
+        schedule.on_result(result)
+        spread = None
+        if schedule.group is not None:
+            spread = self._spreads.setdefault(schedule.group, random.uniform(-1.0, 1.0))
+        delay = schedule.next_delay(spread=spread)
+        self._push(time.monotonic() + delay, schedule)
+        return delay
+
+    def time_until_next(self) -> Optional[float]:
+        self._drop_stale()
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
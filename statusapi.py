@@ -0,0 +1,195 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from monitors.coalesce import RequestCoalescer
+from monitors.ratelimit import TokenBucket
+
+
+class StatusAPI:
+    """只读的状态查询接口（HTTP/JSON），数据来自进程内的状态缓存
+
+    - GET /status                   所有公司的最新状态
+    - GET /status/<公司名>           单个公司的最新状态
+    - GET /history/<公司名>?limit=N  状态变化时间线（需 sqlite 状态存储）
+
+    状态在 ttl 秒内直接返回缓存；过期时按需刷新一次，刷新满足：
+    - 同一公司的并发刷新合并为一次查询（其余请求等待并共享结果）
+    - 所有刷新共用一个令牌桶（refresh_rate 次/秒，突发 refresh_burst 次），
+      没有令牌时直接返回过期的缓存（stale 为 true），因此读请求再多也不会增加对招聘网站的请求量
+    """
+
+    def __init__(
+        self,
+        state_store,
+        listen: str = "127.0.0.1",
+        port: int = 8080,
+        ttl: float = 300.0,
+        refresh_rate: float = 0.1,
+        refresh_burst: float = 3,
+        leases=None,
+    ):
+        self.state_store = state_store
+        self.leases = leases
+        self.ttl = float(ttl)
+        self._bucket = TokenBucket(refresh_rate, refresh_burst) if refresh_rate else None
+        self._coalescer = RequestCoalescer(window=0)
+        self._monitors: Dict[str, object] = {}
+        self._notifier = None
+        self._httpd = ThreadingHTTPServer((listen, int(port)), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="status-api", daemon=True
+        )
+
+    @classmethod
+    def from_config(cls, cfg: dict, state_store, leases=None) -> Optional["StatusAPI"]:
+        """从 config.json 的 api 字段构建，未配置 port 时返回 None
+
+        {
+          "api": {
+            "listen": "127.0.0.1",
+            "port": 8080,
+            "ttl": 300,
+            "refresh_rate": 0.1,
+            "refresh_burst": 3
+          }
+        }
+        refresh_rate 为 0 时只返回缓存，从不触发刷新；启用租约时只刷新本副本持有租约的公司。
+        """
+        a = cfg.get("api", {})
+        if not a.get("port"):
+            return None
+        try:
+            return cls(
+                state_store,
+                listen=a.get("listen", "127.0.0.1"),
+                port=a["port"],
+                ttl=a.get("ttl", 300),
+                refresh_rate=a.get("refresh_rate", 0.1),
+                refresh_burst=a.get("refresh_burst", 3),
+                leases=leases,
+            )
+        except OSError as e:
+            logging.error(f"状态查询接口启动失败: {str(e)}")
+            return None
+
+    @property
+    def address(self):
+        return self._httpd.server_address[:2]
+
+    def start(self) -> "StatusAPI":
+        self._thread.start()
+        host, port = self.address
+        logging.info(f"状态查询接口已启动: http://{host}:{port}/status")
+        return self
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def update(self, monitors: List, notifier) -> None:
+        """设置（或在配置重载后替换）可查询的监控器与通知器"""
+        self._monitors = {m.company_name: m for m in monitors}
+        self._notifier = notifier
+
+    # --- 查询 ---
+    def status(self, company: str) -> Optional[dict]:
+        monitor = self._monitors.get(company)
+        if monitor is None:
+            return None
+        if not self._is_fresh(monitor):
+            try:
+                self._coalescer.do(("refresh", company), lambda: self._refresh(monitor))
+            except Exception as e:
+                logging.error(f"{company} 按需刷新失败: {str(e)}")
+        return self._snapshot(monitor)
+
+    def statuses(self) -> List[dict]:
+        return [self.status(name) for name in list(self._monitors)]
+
+    def history(self, company: str, limit: int = 100) -> Optional[List[dict]]:
+        timeline = getattr(self.state_store, "timeline", None)
+        if timeline is None or company not in self._monitors:
+            return None
+        return [
+            {"observed_at": at, "position": position, "status": status}
+            for at, position, status in timeline(company, limit=limit)
+        ]
+
+    # --- 内部方法 ---
+    def _is_fresh(self, monitor) -> bool:
+        return (
+            monitor.last_checked is not None
+            and time.time() - monitor.last_checked < self.ttl
+        )
+
+    def _refresh(self, monitor) -> None:
+        # 在合并后的唯一一次调用中再判断，等待中的请求不会各自消耗令牌
+        if self._is_fresh(monitor) or self._bucket is None or monitor.breaker.is_open:
+            return
+        if self.leases is not None and not self.leases.claim([monitor], self.state_store):
+            # 由其他副本检查的公司，从共享状态库读取对方保存的最新状态
+            self.state_store.reload([monitor.company_name])
+            return
+        if not self._bucket.try_acquire():
+            logging.debug(f"{monitor.company_name} 按需刷新已达速率上限，返回缓存")
+            return
+        # 不复用主循环本轮已合并的结果，checked_at 为真实请求上游的时间
+        monitor.check_update(self._notifier, fresh=True)
+
+    def _snapshot(self, monitor) -> dict:
+        checked = monitor.last_checked
+        return {
+            "company": monitor.company_name,
+            "provider": monitor.provider_name,
+            "status": self.state_store.get(monitor.company_name),
+            "checked_at": checked,
+            "age": None if checked is None else round(time.time() - checked, 1),
+            "stale": not self._is_fresh(monitor),
+            "auth_failed": monitor.breaker.is_open,
+        }
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                parts = [unquote(p) for p in url.path.split("/") if p]
+                query = parse_qs(url.query)
+                if parts == ["status"]:
+                    self._reply(200, api.statuses())
+                elif len(parts) == 2 and parts[0] == "status":
+                    self._reply_or_404(api.status(parts[1]))
+                elif len(parts) == 2 and parts[0] == "history":
+                    try:
+                        limit = int(query.get("limit", ["100"])[0])
+                    except ValueError:
+                        limit = 100
+                    self._reply_or_404(api.history(parts[1], limit))
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def _reply_or_404(self, data):
+                if data is None:
+                    self._reply(404, {"error": "not found"})
+                else:
+                    self._reply(200, data)
+
+            def _reply(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                logging.debug("api: " + fmt % args)
+
+        return Handler
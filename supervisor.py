@@ -0,0 +1,156 @@
+"""分片模式：把所有公司按一致性哈希分给 N 个工作进程
+
+    python supervisor.py --workers 4
+
+每个工作进程运行 `main.py --worker <编号> --shard-file <分片文件>`，只检查分给自己的公司
+（同一用户的公司总在同一个进程中）。工作进程退出时，supervisor 把它从分片文件中移除，
+其余进程在下一次检查配置时接手它的公司；随后按退避时间重启它，重启后公司再迁回。
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from monitors.state import atomic_write_text
+
+SHARD_FILE = os.environ.get("SHARD_FILE_PATH", "shards.json")
+
+# 启动不足该秒数的工作进程不发送 SIGHUP
+_SIGNAL_GRACE = 10.0
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[subprocess.Popen] = None
+        self.failures = 0
+        self.restart_at = 0.0
+        self.started_at = 0.0
+
+
+class Supervisor:
+    def __init__(
+        self,
+        workers: int,
+        shard_file: str = SHARD_FILE,
+        replicas: int = 64,
+        restart_base: float = 5.0,
+        restart_max: float = 300.0,
+    ):
+        self.shard_file = Path(shard_file)
+        self.replicas = int(replicas)
+        self.restart_base = float(restart_base)
+        self.restart_max = float(restart_max)
+        self._workers: Dict[int, _Worker] = {i: _Worker(i) for i in range(int(workers))}
+        self._stopping = False
+
+    def _live(self):
+        return sorted(
+            w.index for w in self._workers.values()
+            if w.process is not None and w.process.poll() is None
+        )
+
+    def _publish(self, members) -> None:
+        """写入分片文件并通知存活的工作进程尽快重新分配"""
+        atomic_write_text(
+            self.shard_file,
+            json.dumps({"workers": list(members), "replicas": self.replicas}),
+        )
+        if not hasattr(signal, "SIGHUP"):
+            # 不支持 SIGHUP 的平台上，工作进程会在下一次轮询配置时发现分片文件变化
+            return
+        now = time.monotonic()
+        for index in self._live():
+            worker = self._workers[index]
+            # 刚启动的进程可能还没注册 SIGHUP 处理（默认动作是退出），由它自己轮询发现变化
+            if now - worker.started_at < _SIGNAL_GRACE:
+                continue
+            try:
+                os.kill(worker.process.pid, signal.SIGHUP)
+            except OSError:
+                pass
+
+    def _spawn(self, worker: _Worker, publish: bool = True) -> None:
+        if publish:
+            # 新进程启动前先把它加入分片，启动时即可读到自己负责的公司
+            self._publish(sorted(set(self._live()) | {worker.index}))
+        worker.process = subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(__file__).with_name("main.py")),
+                "--worker",
+                str(worker.index),
+                "--shard-file",
+                str(self.shard_file),
+            ]
+        )
+        worker.started_at = time.monotonic()
+        logging.info(f"工作进程 {worker.index} 已启动 (pid {worker.process.pid})")
+
+    def run(self) -> int:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._on_stop)
+        self._publish(sorted(self._workers))
+        for worker in self._workers.values():
+            self._spawn(worker, publish=False)
+
+        while not self._stopping:
+            now = time.monotonic()
+            for worker in self._workers.values():
+                process = worker.process
+                if process is not None and process.poll() is not None:
+                    # 运行超过一分钟后才退出的视为偶发故障，重置退避
+                    if now - worker.started_at > 60:
+                        worker.failures = 0
+                    worker.failures += 1
+                    delay = min(
+                        self.restart_base * 2 ** (worker.failures - 1), self.restart_max
+                    )
+                    logging.warning(
+                        f"工作进程 {worker.index} 已退出（退出码 {process.returncode}），"
+                        f"其公司交由其余进程接手，{delay:.0f} 秒后重启"
+                    )
+                    worker.process = None
+                    worker.restart_at = now + delay
+                    self._publish(self._live())
+                elif process is None and now >= worker.restart_at:
+                    self._spawn(worker)
+            time.sleep(1)
+
+        for worker in self._workers.values():
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+        for worker in self._workers.values():
+            if worker.process is not None:
+                try:
+                    worker.process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+        return 0
+
+    def _on_stop(self, _signum, _frame):
+        logging.info("收到退出信号，正在停止所有工作进程")
+        self._stopping = True
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="按一致性哈希把公司分给多个工作进程")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="工作进程数（默认等于 CPU 核数）"
+    )
+    parser.add_argument("--shard-file", default=SHARD_FILE, help="分片文件路径")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    return Supervisor(args.workers, args.shard_file).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
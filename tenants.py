@@ -0,0 +1,121 @@
+import bisect
+import copy
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from monitors.state import tagged_path
+
+
+def expand_tenants(config: dict) -> dict:
+    """把多用户配置展开为扁平的 companies 列表（返回新的配置，不修改原配置）
+
+    {
+      "email": {"smtp_server": "...", "sender": "...", "password": "..."},
+      "tenants": [
+        {
+          "name": "alice",
+          "email": {"receiver": "alice@example.com"},
+          "companies": [{"name": "米哈游", "provider": "mihoyo", "headers": {...}}]
+        }
+      ]
+    }
+    用户的公司条目名称变为 "用户名/公司名"（状态与通知按此区分），并带上 tenant 字段；
+    顶层 companies 仍然有效，属于默认用户（使用顶层 email）。
+    """
+    tenants = config.get("tenants")
+    if not tenants:
+        return config
+    config = dict(config)
+    companies = list(config.get("companies", []))
+    for tenant in tenants:
+        name = tenant["name"]
+        for company in tenant.get("companies", []):
+            company = dict(company)
+            company["name"] = f"{name}/{company.get('name')}"
+            company["tenant"] = name
+            companies.append(company)
+    config["companies"] = companies
+    return config
+
+
+def shard_key(company: dict) -> str:
+    """分片键：同一用户的公司总在同一个工作进程中（通知队列只有一个写入者）"""
+    return company.get("tenant") or company.get("name") or ""
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """一致性哈希环：每个节点在环上放置 replicas 个虚拟节点
+
+    增减节点时只有相邻区间的键会迁移，其余键的归属不变。
+    """
+
+    def __init__(self, nodes, replicas: int = 64):
+        self.nodes = sorted(str(n) for n in nodes)
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for point, node in sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        ):
+            self._points.append(point)
+            self._owners.append(node)
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class Shard:
+    """工作进程所负责的分片
+
+    分片文件由 supervisor 维护（{"workers": [存活的工作进程编号], "replicas": 64}），
+    每次加载配置时重新读取，据此计算本进程负责的公司。
+    """
+
+    def __init__(self, worker: int, path: str):
+        self.worker = int(worker)
+        self.path = Path(path)
+
+    def ring(self) -> HashRing:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logging.error(f"分片文件读取失败，暂按仅本进程处理: {str(e)}")
+            data = {}
+        workers = data.get("workers") or [self.worker]
+        return HashRing(workers, replicas=int(data.get("replicas", 64)))
+
+    def apply(self, config: dict, log_file: str) -> dict:
+        """只保留本进程负责的公司，并把进程独占的资源（端口、文件）按编号区分
+
+        log_file 为未配置 logging.file 时的默认日志路径。
+        """
+        config = copy.deepcopy(config)
+        ring = self.ring()
+        me = str(self.worker)
+        config["companies"] = [
+            c for c in config.get("companies", []) if ring.node_for(shard_key(c)) == me
+        ]
+
+        # 多个进程共享同一个状态库：JSON 文件会被互相覆盖，因此固定使用 sqlite
+        state = config.setdefault("state", {})
+        if str(state.get("backend", "json")).lower() != "sqlite":
+            state["backend"] = "sqlite"
+            state.pop("path", None)
+
+        for section in ("metrics", "api"):
+            if config.get(section, {}).get("port"):
+                config[section]["port"] = int(config[section]["port"]) + self.worker
+        if config.get("metrics", {}).get("file"):
+            config["metrics"]["file"] = tagged_path(config["metrics"]["file"], self.worker)
+        logging_cfg = config.setdefault("logging", {})
+        logging_cfg["file"] = tagged_path(logging_cfg.get("file") or log_file, self.worker)
+        return config